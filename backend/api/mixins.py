@@ -1,12 +1,26 @@
 """Модуль содержит дополнительные классы
 для настройки основных классов приложения.
 """
-from django.db.models import Model, Q
-from django.db.utils import IntegrityError
+from core.caching import get_cached_content
+from core.enums import Limits
+from core.services import (
+    bulk_delete_links,
+    bulk_insert_ignore,
+    change_counters,
+    insert_link,
+    subscribed_authors,
+)
+from django.core.exceptions import ValidationError
+from django.core.handlers.wsgi import WSGIRequest
+from django.db.models import Field, Model
+from django.db.transaction import atomic
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.serializers import ModelSerializer
 from rest_framework.status import (
+    HTTP_200_OK,
     HTTP_201_CREATED,
     HTTP_204_NO_CONTENT,
     HTTP_400_BAD_REQUEST,
@@ -19,55 +33,132 @@ class AddDelViewMixin:
 
     Содержит методы для добавления или удаления объекта связи
     Many-to-Many между моделями.
-    Требует определения атрибутов `add_serializer` и `link_model`.
+    Требует определения атрибутов `add_serializer`, `link_model`
+    и `link_field` - поля модели связи, ссылающегося на объект.
+    Второе поле связи - `user`.
+    В атрибуте `link_counters` можно указать для модели связи хранимый
+    счётчик объекта, который изменяется в одной транзакции со связью.
 
     Example:
         class ExampleViewSet(ModelViewSet, AddDelViewMixin)
             ...
             add_serializer = ExamplSerializer
             link_model = M2M_Model
+            link_field = "obj_field"
+            link_counters = {M2M_Model: "obj_count"}
     """
 
     add_serializer: ModelSerializer | None = None
     link_model: Model | None = None
+    link_field: str | None = None
+    link_counters: dict[type[Model], str] = {}
+
+    def _make_link(self, obj_id: int | str) -> Model:
+        """Несохранённая связь текущего пользователя с объектом.
+
+        Args:
+            obj_id (int | str): `id` объекта.
+
+        Returns:
+            Model: Объект модели `link_model`.
+        """
+        return self.link_model(
+            **{
+                self._link_field().attname: obj_id,
+                "user_id": self.request.user.pk,
+            }
+        )
+
+    def _link_field(self) -> Field:
+        """Поле модели связи, ссылающееся на объект.
+
+        Returns:
+            Field: Поле `link_field` модели `link_model`.
+        """
+        return self.link_model._meta.get_field(self.link_field)
+
+    def _links_changed(self, obj_ids: list[int], delta: int) -> None:
+        """Обновляет данные, зависящие от связей, в их транзакции.
+
+        По умолчанию изменяет счётчик из `link_counters` одним запросом
+        для всех объектов. Переопределяется во ViewSet, если от связей
+        зависят и другие данные.
+
+        Args:
+            obj_ids (list[int]): `id` объектов, связи с которыми
+                созданы или удалены.
+            delta (int): 1 - связи созданы, -1 - удалены.
+        """
+        if self.link_model not in self.link_counters:
+            return
+
+        model = self._link_field().related_model
+        change_counters(
+            model, obj_ids, self.link_counters[self.link_model], delta
+        )
 
     def _create_relation(self, obj_id: int | str) -> Response:
         """Добавляет связь M2M между объектами.
 
+        Связь создаётся одним запросом `INSERT ... SELECT ... ON CONFLICT
+        DO NOTHING`, который сам проверяет существование объекта,
+        повторное добавление не вызывает ошибку базы данных. Только если
+        связь не добавлена, отдельный запрос определяет, есть ли объект.
+        Для ответа объект читается после фиксации транзакции.
+
         Args:
             obj_id (int | str):
                 `id` объекта, с которым требуется создать связь.
 
+        Raises:
+            Http404: Объекта не существует.
+
         Returns:
             Responce: Статус подтверждающий/отклоняющий действие.
         """
-        obj = get_object_or_404(self.queryset, pk=obj_id)
         try:
-            self.link_model(None, obj.pk, self.request.user.pk).save()
-        except IntegrityError:
+            obj_id = self._link_field().target_field.to_python(obj_id)
+        except ValidationError:
+            raise Http404
+        with atomic():
+            created = insert_link(self._make_link(obj_id), self.link_field)
+            if created:
+                self._links_changed([obj_id], 1)
+
+        if not created:
+            if not self.queryset.filter(pk=obj_id).exists():
+                raise Http404
             return Response(
                 {"error": "Действие выполнено ранее."},
                 status=HTTP_400_BAD_REQUEST,
             )
 
-        serializer: ModelSerializer = self.add_serializer(obj)
+        serializer: ModelSerializer = self.add_serializer(
+            get_object_or_404(self.queryset, pk=obj_id)
+        )
         return Response(serializer.data, status=HTTP_201_CREATED)
 
-    def _delete_relation(self, q: Q) -> Response:
+    def _delete_relation(self, obj_id: int | str) -> Response:
         """Удаляет связь M2M между объектами.
 
+        Связь удаляется одним запросом DELETE с фильтром,
+        количество удалённых строк определяет ответ.
+
         Args:
-            q (Q):
-                Условие фильтрации объектов.
+            obj_id (int | str):
+                `id` объекта, связь с которым требуется удалить.
 
         Returns:
             Responce: Статус подтверждающий/отклоняющий действие.
         """
-        deleted, _ = (
-            self.link_model.objects.filter(q & Q(user=self.request.user))
-            .first()
-            .delete()
-        )
+        with atomic():
+            deleted, _ = self.link_model.objects.filter(
+                **{self._link_field().attname: obj_id},
+                user=self.request.user,
+            ).delete()
+            if deleted:
+                self._links_changed([obj_id], -1)
+
         if not deleted:
             return Response(
                 {"error": f"{self.link_model.__name__} не существует"},
@@ -75,3 +166,225 @@ class AddDelViewMixin:
             )
 
         return Response(status=HTTP_204_NO_CONTENT)
+
+    def _batch_ids(self) -> list[int] | None:
+        """Список `id` объектов из тела пакетного запроса.
+
+        Ожидается тело вида `{"ids": [1, 2, 3]}`.
+
+        Returns:
+            list[int] | None: Уникальные `id` в порядке передачи
+            или None, если список не передан или некорректен.
+        """
+        ids = self.request.data.get("ids")
+        if not isinstance(ids, list) or not (
+            0 < len(ids) <= Limits.MAX_BATCH_SIZE
+        ):
+            return None
+        if not all(
+            isinstance(obj_id, int) and not isinstance(obj_id, bool)
+            for obj_id in ids
+        ):
+            return None
+        return list(dict.fromkeys(ids))
+
+    def _batch_error(self) -> Response:
+        """Ответ на пакетный запрос с некорректным списком `id`.
+
+        Returns:
+            Responce: Сообщение об ошибке.
+        """
+        return Response(
+            {
+                "error": (
+                    "Передайте список `ids` из целых чисел, не более "
+                    f"{Limits.MAX_BATCH_SIZE.value} элементов."
+                )
+            },
+            status=HTTP_400_BAD_REQUEST,
+        )
+
+    def _create_relations(self) -> Response:
+        """Добавляет связи M2M с несколькими объектами.
+
+        Все связи создаются одним запросом
+        `INSERT ... ON CONFLICT DO NOTHING RETURNING` в одной транзакции.
+        База возвращает только добавленные связи, поэтому связь,
+        параллельно созданная другим запросом, не учитывается дважды.
+        Зависимые данные обновляются одним вызовом для всех связей.
+
+        Returns:
+            Responce: `id` объектов по результатам: `created` - связь
+            создана, `exists` - уже была, `not_found` - объекта нет.
+        """
+        ids = self._batch_ids()
+        if ids is None:
+            return self._batch_error()
+
+        found = set(
+            self.queryset.filter(pk__in=ids).values_list("pk", flat=True)
+        )
+        with atomic():
+            created = set(
+                bulk_insert_ignore(
+                    (self._make_link(obj_id) for obj_id in found),
+                    self._link_field().attname,
+                )
+            )
+            self._links_changed(list(created), 1)
+
+        return Response(
+            {
+                "created": [obj_id for obj_id in ids if obj_id in created],
+                "exists": [
+                    obj_id
+                    for obj_id in ids
+                    if obj_id in found and obj_id not in created
+                ],
+                "not_found": [obj_id for obj_id in ids if obj_id not in found],
+            },
+            status=HTTP_200_OK,
+        )
+
+    def _delete_relations(self) -> Response:
+        """Удаляет связи M2M с несколькими объектами.
+
+        Все связи удаляются одним запросом `DELETE ... RETURNING`
+        в одной транзакции. База возвращает только удалённые связи,
+        по ним строится ответ и одним вызовом обновляются зависимые данные.
+
+        Returns:
+            Responce: `id` объектов по результатам: `deleted` - связь
+            удалена, `not_found` - связи не было.
+        """
+        ids = self._batch_ids()
+        if ids is None:
+            return self._batch_error()
+
+        with atomic():
+            deleted = set(
+                bulk_delete_links(
+                    self.link_model, self.link_field, self.request.user.pk, ids
+                )
+            )
+            if deleted:
+                self._links_changed(list(deleted), -1)
+
+        return Response(
+            {
+                "deleted": [obj_id for obj_id in ids if obj_id in deleted],
+                "not_found": [
+                    obj_id for obj_id in ids if obj_id not in deleted
+                ],
+            },
+            status=HTTP_200_OK,
+        )
+
+
+class SubscribedAuthorsMixin:
+    """
+    Добавляет в контекст сериализатора подписки текущего пользователя.
+
+    При сериализации списка объектов одним запросом определяет, на кого из
+    выводимых авторов подписан пользователь, и передаёт множество их `id`
+    в контекст под ключом `subscriptions`. Его использует
+    `UserSerializer.get_is_subscribed` вместо запроса для каждого автора.
+    Атрибут `author_id_attr` указывает, где у объекта списка `id` автора.
+    Миксин должен стоять в MRO перед базовым ViewSet.
+
+    Example:
+        class ExampleViewSet(SubscribedAuthorsMixin, ModelViewSet)
+            ...
+            author_id_attr = "author_id"
+    """
+
+    author_id_attr: str = "id"
+
+    def get_serializer(self, *args, **kwargs) -> ModelSerializer:
+        kwargs.setdefault("context", self.get_serializer_context())
+        if args and kwargs.get("many"):
+            author_ids = {
+                getattr(obj, self.author_id_attr) for obj in args[0]
+            }
+            kwargs["context"]["subscriptions"] = subscribed_authors(
+                self.request.user, author_ids
+            )
+        return super().get_serializer(*args, **kwargs)
+
+
+class CachedListMixin:
+    """
+    Отдаёт список объектов из кэша сериализованных ответов.
+
+    Ответ в формате JSON строится один раз для каждой версии таблицы
+    (см. `core.caching`) и отдаётся с ETag. На запрос с совпадающим
+    заголовком `If-None-Match` возвращается статус 304.
+    Требует определения атрибута `cache_name` - название набора данных,
+    версию которого увеличивают сигналы. Метод `is_cacheable()` позволяет
+    отключить кэш для запросов с фильтрами.
+    Миксин должен стоять в MRO перед базовым ViewSet.
+
+    Example:
+        class ExampleViewSet(CachedListMixin, ReadOnlyModelViewSet)
+            ...
+            cache_name = "examples"
+    """
+
+    cache_name: str | None = None
+
+    def is_cacheable(self, request: WSGIRequest) -> bool:
+        """Можно ли отдать ответ на запрос из кэша.
+
+        Кэшируется только полный список в формате JSON. Переопределяется
+        во ViewSet, если список зависит от параметров запроса.
+
+        Args:
+            request (WSGIRequest): Объект запроса.
+
+        Returns:
+            bool: True - ответ берётся из кэша.
+        """
+        return request.accepted_renderer.format == "json"
+
+    def _render_list(self) -> bytes:
+        """Сериализует полный список объектов для кэша.
+
+        Вызывается из `get_cached_content`, только если в кэше нет ответа
+        для текущей версии таблицы.
+
+        Returns:
+            bytes: Тело ответа в формате выбранного рендерера.
+        """
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return self.request.accepted_renderer.render(
+            serializer.data,
+            self.request.accepted_media_type,
+            self.get_renderer_context(),
+        )
+
+    def list(self, request: WSGIRequest, *args, **kwargs) -> HttpResponse:
+        """Выводит список объектов из кэша с заголовком ETag.
+
+        Если `is_cacheable()` возвращает False, список строится
+        базовым ViewSet без кэша.
+
+        Args:
+            request (WSGIRequest): Объект запроса.
+
+        Returns:
+            HttpResponse: Список объектов или статус 304, если ETag
+            из `If-None-Match` совпадает с текущим.
+        """
+        if not self.is_cacheable(request):
+            return super().list(request, *args, **kwargs)
+
+        cached = get_cached_content(self.cache_name, self._render_list)
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if cached.etag in etags or "*" in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                cached.content, content_type=request.accepted_media_type
+            )
+        response["ETag"] = cached.etag
+        return response
@@ -0,0 +1,19 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+from rest_framework.request import Request
+
+
+class FileContentNegotiation(DefaultContentNegotiation):
+    """Выбор рендерера без учёта параметра `format`.
+
+    В эндпоинтах выгрузки файлов параметр `format` задаёт формат файла,
+    а не формат ответа API. Ошибки отдаются первым рендерером из списка.
+    """
+
+    def select_renderer(
+        self,
+        request: Request,
+        renderers: list[BaseRenderer],
+        format_suffix: str | None = None,
+    ) -> tuple[BaseRenderer, str]:
+        return renderers[0], renderers[0].media_type
@@ -1,9 +1,180 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from core.enums import Limits, UrlQueries
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.wsgi import WSGIRequest
+from django.db.models import Model, Q, QuerySet
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.routers import APIRootView
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Постраничный вывод по курсору (keyset pagination).
+
+    Вместо OFFSET/LIMIT и подсчёта `COUNT(*)` следующая страница выбирается
+    условием "после последнего показанного объекта" по полям сортировки,
+    поэтому стоимость запроса не зависит от глубины пролистывания.
+    Поля сортировки берутся из атрибута `cursor_ordering` представления,
+    последнее поле должно быть уникальным.
+
+    Attributes:
+        ordering (tuple[str]):
+            Сортировка по умолчанию, если у представления
+            не задан атрибут `cursor_ordering`.
+    """
+
+    cursor_query_param = UrlQueries.CURSOR.value
+    page_size_query_param = "limit"
+    page_size = Limits.CURSOR_PAGE_SIZE.value
+    ordering = ("-pub_date", "-id")
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(
+        self,
+        queryset: QuerySet,
+        request: WSGIRequest,
+        view: APIRootView | None = None,
+    ) -> list[Model]:
+        self.request = request
+        self.ordering = getattr(view, "cursor_ordering", self.ordering)
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = self.decode_cursor(cursor)
+            try:
+                queryset = queryset.filter(self.after(values))
+            except (TypeError, ValueError, DjangoValidationError):
+                # Значение курсора не приводится к типу поля сортировки
+                raise ValidationError(self.invalid_cursor_message)
+
+        page = list(queryset[: self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response(
+            OrderedDict(
+                (
+                    ("next", self.get_next_link()),
+                    ("results", data),
+                )
+            )
+        )
+
+    def get_page_size(self, request: WSGIRequest) -> int:
+        limit = request.query_params.get(self.page_size_query_param, "")
+        if limit.isdigit() and int(limit) > 0:
+            return int(limit)
+        return self.page_size
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        last = self.page[-1]
+        values = [getattr(last, f.lstrip("-")) for f in self.ordering]
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(values)
+        )
+
+    def after(self, values: list) -> Q:
+        """Условие выборки объектов, следующих за курсором.
+
+        Для сортировки `("-pub_date", "-id")` это
+        `pub_date < v0 OR (pub_date = v0 AND id < v1)`.
+
+        Args:
+            values (list): Значения полей сортировки из курсора.
+
+        Returns:
+            Q: Условие фильтрации.
+        """
+        condition = Q()
+        for idx, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            step = Q(**{f"{name}__{lookup}": values[idx]})
+            for prev, value in zip(self.ordering[:idx], values):
+                step &= Q(**{prev.lstrip("-"): value})
+            condition |= step
+        return condition
+
+    def encode_cursor(self, values: list) -> str:
+        values = [
+            v.isoformat() if isinstance(v, datetime) else v for v in values
+        ]
+        raw = json.dumps(values, ensure_ascii=False).encode()
+        return urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> list:
+        """Декодирует курсор из параметра запроса.
+
+        Курсор принимается, только если это JSON-список из строк и целых
+        чисел по одному значению на каждое поле сортировки.
+
+        Args:
+            cursor (str): Значение параметра `cursor`.
+
+        Raises:
+            ValidationError: Курсор повреждён или подделан (ответ 400).
+
+        Returns:
+            list: Значения полей сортировки.
+        """
+        try:
+            raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            values = json.loads(raw)
+        except ValueError:
+            raise ValidationError(self.invalid_cursor_message)
+
+        if (
+            not isinstance(values, list)
+            or len(values) != len(self.ordering)
+            or not all(
+                isinstance(value, (str, int)) and not isinstance(value, bool)
+                for value in values
+            )
+        ):
+            raise ValidationError(self.invalid_cursor_message)
+        return values
 
 
 class PageLimitPagination(PageNumberPagination):
     """Стандартный пагинатор с определением атрибута
     `page_size_query_param`, для вывода запрошенного количества страниц.
+
+    При наличии в запросе параметра `cursor` выдача переключается
+    на постраничный вывод по курсору (см. `KeysetPagination`).
     """
 
     page_size_query_param = "limit"
+    cursor_query_param = UrlQueries.CURSOR.value
+    keyset: KeysetPagination | None = None
+
+    def paginate_queryset(
+        self,
+        queryset: QuerySet,
+        request: WSGIRequest,
+        view: APIRootView | None = None,
+    ) -> list[Model] | None:
+        if self.cursor_query_param not in request.query_params:
+            self.keyset = None
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = KeysetPagination()
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: list) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
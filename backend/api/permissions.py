@@ -1,6 +1,7 @@
 from django.core.handlers.wsgi import WSGIRequest
 from django.db.models import Model
 from rest_framework.permissions import DjangoModelPermissions  # noqa F401
+from rest_framework.permissions import IsAdminUser  # noqa F401
 from rest_framework.permissions import IsAuthenticated  # noqa F401
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 from rest_framework.routers import APIRootView
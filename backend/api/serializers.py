@@ -1,26 +1,91 @@
 from collections import OrderedDict
 
-from core.services import recipe_ingredients_set
+from core.images import (
+    IMAGE_FORMATS,
+    IMAGE_VARIANTS,
+    decode_base64_image,
+    variant_name,
+)
+from core.services import (
+    fan_out_recipe,
+    prefetch_recipe_relations,
+    recipe_ingredients_set,
+    recipe_ingredients_update,
+)
 from core.validators import ingredients_validator, tags_exist_validator
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db.models import F, QuerySet
+from django.core.files import File
+from django.db.models.fields.files import FieldFile
 from django.db.transaction import atomic
-from drf_extra_fields.fields import Base64ImageField
 from recipes.models import Ingredient, Recipe, Tag
-from rest_framework.serializers import ModelSerializer, SerializerMethodField
+from rest_framework.serializers import (
+    Field,
+    ImageField,
+    ModelSerializer,
+    ReadOnlyField,
+    Serializer,
+    SerializerMethodField,
+)
 
 User = get_user_model()
 
 
+class RecipeImageField(ImageField):
+    """Изображение рецепта, переданное строкой Base64.
+
+    Строка декодируется частями без полной копии в памяти, размер
+    и формат проверяются до декодирования пикселей
+    (см. `core.images.decode_base64_image`).
+    """
+
+    def to_internal_value(self, data: str) -> File:
+        if not isinstance(data, str):
+            raise ValidationError("Ожидается изображение в Base64.")
+        return decode_base64_image(data)
+
+
+class ImageVariantsField(Field):
+    """Ссылки на варианты изображения рецепта.
+
+    Выводит словарь `{размер: {формат: url}}` для размеров
+    `core.images.IMAGE_VARIANTS` и форматов `core.images.IMAGE_FORMATS`.
+    Варианты строятся после сохранения рецепта, до этого клиенту следует
+    использовать исходное изображение.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        kwargs.update(source="image", read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, image: FieldFile) -> dict | None:
+        if not image:
+            return None
+
+        request = self.context.get("request")
+        variants = {}
+        for size in IMAGE_VARIANTS:
+            variants[size] = {}
+            for image_format in IMAGE_FORMATS:
+                url = image.storage.url(
+                    variant_name(image.name, size, image_format)
+                )
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[size][image_format] = url
+        return variants
+
+
 class ShortRecipeSerializer(ModelSerializer):
     """Сериализатор для модели Recipe.
     Определён укороченный набор полей для некоторых эндпоинтов.
     """
 
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = "id", "name", "image", "cooking_time"
+        fields = "id", "name", "image", "image_variants", "cooking_time"
         read_only_fields = ("__all__",)
 
 
@@ -48,6 +113,9 @@ class UserSerializer(ModelSerializer):
 
         Определяет - подписан ли текущий пользователь
         на просматриваемого пользователя.
+        Если в контексте передано множество `subscriptions`
+        (см. `api.mixins.SubscribedAuthorsMixin`), проверка выполняется
+        по нему без обращения к базе.
 
         Args:
             obj (User): Пользователь, на которого проверяется подписка.
@@ -60,6 +128,10 @@ class UserSerializer(ModelSerializer):
         if user.is_anonymous or (user == obj):
             return False
 
+        subscriptions: set[int] | None = self.context.get("subscriptions")
+        if subscriptions is not None:
+            return obj.pk in subscriptions
+
         return user.subscriptions.filter(author=obj).exists()
 
     def create(self, validated_data: dict) -> User:
@@ -116,13 +188,15 @@ class UserSubscribeSerializer(UserSerializer):
     def get_recipes_count(self, obj: User) -> int:
         """Показывает общее количество рецептов у каждого автора.
 
+        Значение берётся из хранимого счётчика `recipes_count`.
+
         Args:
             obj (User): Запрошенный пользователь.
 
         Returns:
             int: Количество рецептов созданных запрошенным пользователем.
         """
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class TagSerializer(ModelSerializer):
@@ -165,7 +239,8 @@ class RecipeSerializer(ModelSerializer):
     ingredients = SerializerMethodField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
-    image = Base64ImageField()
+    image = RecipeImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -178,6 +253,7 @@ class RecipeSerializer(ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
@@ -186,23 +262,34 @@ class RecipeSerializer(ModelSerializer):
             "is_shopping_cart",
         )
 
-    def get_ingredients(self, recipe: Recipe) -> QuerySet[dict]:
+    def get_ingredients(self, recipe: Recipe) -> list[dict]:
         """Получает список ингридиентов для рецепта.
 
+        Список строится из объектов AmountIngredient, предзагруженных
+        вместе с ингредиентами (см. `core.services.RECIPE_RELATIONS`).
+
         Args:
             recipe (Recipe): Запрошенный рецепт.
 
         Returns:
-            QuerySet[dict]: Список ингридиентов в рецепте.
+            list[dict]: Список ингридиентов в рецепте.
         """
-        ingredients = recipe.ingredients.values(
-            "id", "name", "measurement_unit", amount=F("recipe__amount")
-        )
-        return ingredients
+        return [
+            {
+                "id": link.ingredients.id,
+                "name": link.ingredients.name,
+                "measurement_unit": link.ingredients.measurement_unit,
+                "amount": link.amount,
+            }
+            for link in recipe.ingredient.all()
+        ]
 
     def get_is_favorited(self, recipe: Recipe) -> bool:
         """Проверка - находится ли рецепт в избранном.
 
+        Если queryset рецептов аннотирован признаком `is_favorited`,
+        используется он, иначе выполняется отдельный запрос.
+
         Args:
             recipe (Recipe): Переданный для проверки рецепт.
 
@@ -210,6 +297,10 @@ class RecipeSerializer(ModelSerializer):
             bool: True - если рецепт в `избранном`
             у запращивающего пользователя, иначе - False.
         """
+        is_favorited: bool | None = getattr(recipe, "is_favorited", None)
+        if is_favorited is not None:
+            return is_favorited
+
         user = self.context.get("view").request.user
 
         if user.is_anonymous:
@@ -220,6 +311,9 @@ class RecipeSerializer(ModelSerializer):
     def get_is_in_shopping_cart(self, recipe: Recipe) -> bool:
         """Проверка - находится ли рецепт в списке  покупок.
 
+        Если queryset рецептов аннотирован признаком `is_in_shopping_cart`,
+        используется он, иначе выполняется отдельный запрос.
+
         Args:
             recipe (Recipe): Переданный для проверки рецепт.
 
@@ -227,6 +321,10 @@ class RecipeSerializer(ModelSerializer):
             bool: True - если рецепт в `списке покупок`
             у запращивающего пользователя, иначе - False.
         """
+        in_cart: bool | None = getattr(recipe, "is_in_shopping_cart", None)
+        if in_cart is not None:
+            return in_cart
+
         user = self.context.get("view").request.user
 
         if user.is_anonymous:
@@ -266,7 +364,7 @@ class RecipeSerializer(ModelSerializer):
 
     @atomic
     def create(self, validated_data: dict) -> Recipe:
-        """Создаёт рецепт.
+        """Создаёт рецепт и добавляет его в ленты подписчиков автора.
 
         Args:
             validated_data (dict): Данные для создания рецепта.
@@ -279,12 +377,17 @@ class RecipeSerializer(ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         recipe_ingredients_set(recipe, ingredients)
+        fan_out_recipe(recipe)
+        prefetch_recipe_relations(recipe)
         return recipe
 
     @atomic
     def update(self, recipe: Recipe, validated_data: dict):
         """Обновляет рецепт.
 
+        Тэги и ингредиенты изменяются по разнице между сохранёнными
+        и переданными, неизменённые связи не перезаписываются.
+
         Args:
             recipe (Recipe): Рецепт для изменения.
             validated_data (dict): Изменённые данные.
@@ -300,12 +403,23 @@ class RecipeSerializer(ModelSerializer):
                 setattr(recipe, key, value)
 
         if tags:
-            recipe.tags.clear()
             recipe.tags.set(tags)
 
         if ingredients:
-            recipe.ingredients.clear()
-            recipe_ingredients_set(recipe, ingredients)
+            recipe_ingredients_update(recipe, ingredients)
 
         recipe.save()
+        prefetch_recipe_relations(recipe)
         return recipe
+
+
+class ShoppingListSerializer(Serializer):
+    """Сериализатор строк списка покупок.
+
+    Выводит строки `core.services.shopping_list_ingredients`: одноимённые
+    ингредиенты в кратных единицах уже сведены к базовой единице.
+    """
+
+    name = ReadOnlyField()
+    measurement_unit = ReadOnlyField(source="measurement")
+    amount = ReadOnlyField()
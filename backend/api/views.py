@@ -1,24 +1,49 @@
-from api.mixins import AddDelViewMixin
-from api.paginators import PageLimitPagination
+from api.mixins import (
+    AddDelViewMixin,
+    CachedListMixin,
+    SubscribedAuthorsMixin,
+)
+from api.negotiation import FileContentNegotiation
+from api.paginators import KeysetPagination, PageLimitPagination
 from api.permissions import (
     AdminOrReadOnly,
     AuthorStaffOrReadOnly,
     DjangoModelPermissions,
+    IsAdminUser,
     IsAuthenticated,
 )
 from api.serializers import (
     IngredientSerializer,
     RecipeSerializer,
+    ShoppingListSerializer,
     ShortRecipeSerializer,
     TagSerializer,
     UserSubscribeSerializer,
 )
 from core.enums import Tuples, UrlQueries
-from core.services import create_shoping_list, maybe_incorrect_layout
+from core.search import fuzzy_search_ingredients, ingredients_index
+from core.exports import EXPORT_FORMATS
+from core.services import (
+    RECIPE_RELATIONS,
+    author_recipes,
+    backfill_timeline,
+    change_shopping_lists,
+    clear_timeline,
+    maybe_incorrect_layout,
+    shopping_list_ingredients,
+)
+from core.transfer import export_recipes, import_recipes
 from django.contrib.auth import get_user_model
 from django.core.handlers.wsgi import WSGIRequest
-from django.db.models import Q, QuerySet
-from django.http.response import HttpResponse
+from django.db.models import (
+    Exists,
+    F,
+    OuterRef,
+    QuerySet,
+    Value,
+    prefetch_related_objects,
+)
+from django.http.response import StreamingHttpResponse
 from djoser.views import UserViewSet as DjoserUserViewSet
 from recipes.models import Carts, Favorites, Ingredient, Recipe, Tag
 from rest_framework.decorators import action
@@ -35,7 +60,9 @@ class BaseAPIRootView(APIRootView):
     """Базовые пути API приложения."""
 
 
-class UserViewSet(DjoserUserViewSet, AddDelViewMixin):
+class UserViewSet(
+    SubscribedAuthorsMixin, DjoserUserViewSet, AddDelViewMixin
+):
     """Работает с пользователями.
 
     ViewSet для работы с пользователми - вывод таковых,
@@ -48,6 +75,23 @@ class UserViewSet(DjoserUserViewSet, AddDelViewMixin):
     permission_classes = (DjangoModelPermissions,)
     add_serializer = UserSubscribeSerializer
     link_model = Subscriptions
+    link_field = "author"
+    link_counters = {Subscriptions: "followers_count"}
+    cursor_ordering = ("username", "id")
+
+    def _links_changed(self, obj_ids: list[int], delta: int) -> None:
+        """Обновляет счётчики и ленту подписчика при изменении подписок.
+
+        Args:
+            obj_ids (list[int]): `id` авторов.
+            delta (int): 1 - подписки созданы, -1 - удалены.
+        """
+        super()._links_changed(obj_ids, delta)
+        for author_id in obj_ids:
+            if delta > 0:
+                backfill_timeline(self.request.user.pk, author_id)
+            else:
+                clear_timeline(self.request.user.pk, author_id)
 
     @action(detail=True, permission_classes=(IsAuthenticated,))
     def subscribe(self, request: WSGIRequest, id: int | str) -> Response:
@@ -69,13 +113,18 @@ class UserViewSet(DjoserUserViewSet, AddDelViewMixin):
     def create_subscribe(
         self, request: WSGIRequest, id: int | str
     ) -> Response:
+        if str(id) == str(request.user.pk):
+            return Response(
+                {"error": "Нельзя подписаться на самого себя."},
+                status=HTTP_400_BAD_REQUEST,
+            )
         return self._create_relation(id)
 
     @subscribe.mapping.delete
     def delete_subscribe(
         self, request: WSGIRequest, id: int | str
     ) -> Response:
-        return self._delete_relation(Q(author__id=id))
+        return self._delete_relation(id)
 
     @action(
         methods=("get",), detail=False, permission_classes=(IsAuthenticated,)
@@ -84,6 +133,10 @@ class UserViewSet(DjoserUserViewSet, AddDelViewMixin):
         """Список подписок пользоваетеля.
 
         Вызов метода через url: */user/<int:id>/subscribtions/.
+        С параметром `cursor` выводится постранично по курсору.
+        Авторы выводятся от последней подписки к первой. Параметр
+        `recipes_limit` ограничивает количество рецептов каждого автора,
+        рецепты всех авторов страницы загружаются одним запросом.
 
         Args:
             request (WSGIRequest): Объект запроса.
@@ -93,33 +146,58 @@ class UserViewSet(DjoserUserViewSet, AddDelViewMixin):
                 401 - для неавторизованного пользователя.
                 Список подписок для авторизованного пользователя.
         """
-        pages = self.paginate_queryset(
+        authors = (
             User.objects.filter(subscribers__user=self.request.user)
+            .annotate(subscribed_at=F("subscribers__date_added"))
+            .order_by("-subscribed_at", "-id")
         )
-        serializer = UserSubscribeSerializer(pages, many=True)
+        self.cursor_ordering = ("-subscribed_at", "-id")
+        pages = self.paginate_queryset(authors)
+        authors = list(authors) if pages is None else pages
+
+        limit = request.query_params.get(UrlQueries.RECIPES_LIMIT.value, "")
+        prefetch_related_objects(
+            authors,
+            author_recipes(
+                [author.pk for author in authors],
+                int(limit) if limit.isdigit() else None,
+            ),
+        )
+        serializer = UserSubscribeSerializer(authors, many=True)
+        if pages is None:
+            return Response(serializer.data)
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(CachedListMixin, ReadOnlyModelViewSet):
     """Работает с тэгами.
 
     Изменение и создание тэгов разрешено только админам.
+    Список тэгов отдаётся из кэша с ETag.
     """
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AdminOrReadOnly,)
+    cache_name = "tags"
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CachedListMixin, ReadOnlyModelViewSet):
     """Работет с игридиентами.
 
     Изменение и создание ингридиентов разрешено только админам.
+    Полный список без поиска отдаётся из кэша с ETag.
     """
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AdminOrReadOnly,)
+    cache_name = "ingredients"
+
+    def is_cacheable(self, request: WSGIRequest) -> bool:
+        return super().is_cacheable(request) and not (
+            request.query_params.get(UrlQueries.SEARCH_ING_NAME)
+        )
 
     def get_queryset(self) -> list[Ingredient]:
         """Получает queryset в соответствии с параметрами запроса.
@@ -130,6 +208,10 @@ class IngredientViewSet(ReadOnlyModelViewSet):
         преобразуются в кириллицу (для стандартной раскладки).
         Также прописные буквы преобразуются в строчные,
         так как все ингридиенты в базе записаны в нижнем регистре.
+        Поиск выполняется по индексу в памяти процесса
+        (см. `core.search.ingredients_index`), без запросов к базе.
+        С параметром `fuzzy=1` выполняется нечёткий поиск по триграммам,
+        результаты упорядочены по сходству и ограничены по количеству.
 
         Returns:
             list[Ingredient]: Список найденых ингридиентов.
@@ -141,15 +223,16 @@ class IngredientViewSet(ReadOnlyModelViewSet):
             return queryset
 
         name = maybe_incorrect_layout(name)
-        start_queryset = queryset.filter(name__istartswith=name)
-        start_names = (ing.name for ing in start_queryset)
-        contain_queryset = queryset.filter(name__icontains=name).exclude(
-            name__in=start_names
-        )
-        return list(start_queryset) + list(contain_queryset)
+        fuzzy: str = self.request.query_params.get(UrlQueries.FUZZY_SEARCH)
+        if fuzzy in Tuples.SYMBOL_TRUE_SEARCH.value:
+            return fuzzy_search_ingredients(name)
+
+        return ingredients_index.search(name)
 
 
-class RecipeViewSet(ModelViewSet, AddDelViewMixin):
+class RecipeViewSet(
+    SubscribedAuthorsMixin, ModelViewSet, AddDelViewMixin
+):
     """Работает с рецептами.
 
     Вывод, создание, редактирование, добавление/удаление
@@ -160,15 +243,27 @@ class RecipeViewSet(ModelViewSet, AddDelViewMixin):
     Изменять рецепт может только автор или админы.
     """
 
-    queryset = Recipe.objects.select_related("author")
+    queryset = Recipe.objects.select_related("author").prefetch_related(
+        *RECIPE_RELATIONS
+    )
     serializer_class = RecipeSerializer
     permission_classes = (AuthorStaffOrReadOnly,)
     pagination_class = PageLimitPagination
     add_serializer = ShortRecipeSerializer
+    author_id_attr = "author_id"
+    cursor_ordering = ("-pub_date", "-id")
+    link_field = "recipe"
+    link_counters = {Favorites: "favorites_count"}
 
     def get_queryset(self) -> QuerySet[Recipe]:
         """Получает queryset в соответствии с параметрами запроса.
 
+        Признаки `is_favorited` и `is_in_shopping_cart` вычисляются
+        подзапросами в основном запросе, а не отдельно для каждого рецепта.
+        С параметром `cursor` выдача постраничная по курсору
+        (см. `api.paginators.KeysetPagination`).
+        Фильтр по тэгам - полусоединение EXISTS, без JOIN и DISTINCT.
+
         Returns:
             QuerySet[Recipe]: Список запрошенных объектов.
         """
@@ -176,30 +271,77 @@ class RecipeViewSet(ModelViewSet, AddDelViewMixin):
 
         tags: list = self.request.query_params.getlist(UrlQueries.TAGS.value)
         if tags:
-            queryset = queryset.filter(tags__slug__in=tags).distinct()
+            queryset = queryset.filter(
+                Exists(
+                    Recipe.tags.through.objects.filter(
+                        recipe=OuterRef("pk"), tag__slug__in=tags
+                    )
+                )
+            )
 
         author: str = self.request.query_params.get(UrlQueries.AUTHOR.value)
         if author:
             queryset = queryset.filter(author=author)
 
+        queryset = self._annotate_user_flags(queryset)
         # Следующие фильтры только для авторизованного пользователя
         if self.request.user.is_anonymous:
             return queryset
 
         is_in_cart: str = self.request.query_params.get(UrlQueries.SHOP_CART)
         if is_in_cart in Tuples.SYMBOL_TRUE_SEARCH.value:
-            queryset = queryset.filter(in_carts__user=self.request.user)
+            queryset = queryset.filter(is_in_shopping_cart=True)
         elif is_in_cart in Tuples.SYMBOL_FALSE_SEARCH.value:
-            queryset = queryset.exclude(in_carts__user=self.request.user)
+            queryset = queryset.filter(is_in_shopping_cart=False)
 
         is_favorite: str = self.request.query_params.get(UrlQueries.FAVORITE)
         if is_favorite in Tuples.SYMBOL_TRUE_SEARCH.value:
-            queryset = queryset.filter(in_favorites__user=self.request.user)
+            queryset = queryset.filter(is_favorited=True)
         if is_favorite in Tuples.SYMBOL_FALSE_SEARCH.value:
-            queryset = queryset.exclude(in_favorites__user=self.request.user)
+            queryset = queryset.filter(is_favorited=False)
 
         return queryset
 
+    def _annotate_user_flags(
+        self, queryset: QuerySet[Recipe]
+    ) -> QuerySet[Recipe]:
+        """Добавляет признаки `is_favorited` и `is_in_shopping_cart`.
+
+        Args:
+            queryset (QuerySet[Recipe]): Рецепты.
+
+        Returns:
+            QuerySet[Recipe]: Рецепты с признаками текущего пользователя.
+        """
+        if self.request.user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False), is_in_shopping_cart=Value(False)
+            )
+
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorites.objects.filter(
+                    recipe=OuterRef("pk"), user=self.request.user
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                Carts.objects.filter(
+                    recipe=OuterRef("pk"), user=self.request.user
+                )
+            ),
+        )
+
+    def _links_changed(self, obj_ids: list[int], delta: int) -> None:
+        """Обновляет счётчики и список покупок при изменении связей.
+
+        Args:
+            obj_ids (list[int]): `id` рецептов.
+            delta (int): 1 - связи созданы, -1 - удалены.
+        """
+        super()._links_changed(obj_ids, delta)
+        if self.link_model is Carts:
+            change_shopping_lists(obj_ids, (self.request.user.pk,), delta)
+
     @action(detail=True, permission_classes=(IsAuthenticated,))
     def favorite(self, request: WSGIRequest, pk: int | str) -> Response:
         """Добавляет/удалет рецепт в `избранное`.
@@ -227,7 +369,33 @@ class RecipeViewSet(ModelViewSet, AddDelViewMixin):
         self, request: WSGIRequest, pk: int | str
     ) -> Response:
         self.link_model = Favorites
-        return self._delete_relation(Q(recipe__id=pk))
+        return self._delete_relation(pk)
+
+    @action(
+        methods=("post",),
+        detail=False,
+        url_path="favorite",
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorites_batch(self, request: WSGIRequest) -> Response:
+        """Добавляет/удаляет несколько рецептов в `избранном`.
+
+        Вызов метода через url: */recipe/favorite/.
+        Тело запроса: `{"ids": [1, 2, 3]}`.
+
+        Args:
+            request (WSGIRequest): Объект запроса.
+
+        Returns:
+            Responce: Результат действия для каждого `id`.
+        """
+        self.link_model = Favorites
+        return self._create_relations()
+
+    @favorites_batch.mapping.delete
+    def remove_recipes_from_favorites(self, request: WSGIRequest) -> Response:
+        self.link_model = Favorites
+        return self._delete_relations()
 
     @action(detail=True, permission_classes=(IsAuthenticated,))
     def shopping_cart(self, request: WSGIRequest, pk: int | str) -> Response:
@@ -254,30 +422,190 @@ class RecipeViewSet(ModelViewSet, AddDelViewMixin):
         self, request: WSGIRequest, pk: int | str
     ) -> Response:
         self.link_model = Carts
-        return self._delete_relation(Q(recipe__id=pk))
+        return self._delete_relation(pk)
 
-    @action(methods=("get",), detail=False)
+    @action(
+        methods=("post",),
+        detail=False,
+        url_path="shopping_cart",
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_batch(self, request: WSGIRequest) -> Response:
+        """Добавляет/удаляет несколько рецептов в `списке покупок`.
+
+        Вызов метода через url: */recipe/shopping_cart/.
+        Тело запроса: `{"ids": [1, 2, 3]}`.
+
+        Args:
+            request (WSGIRequest): Объект запроса.
+
+        Returns:
+            Responce: Результат действия для каждого `id`.
+        """
+        self.link_model = Carts
+        return self._create_relations()
+
+    @shopping_cart_batch.mapping.delete
+    def remove_recipes_from_cart(self, request: WSGIRequest) -> Response:
+        self.link_model = Carts
+        return self._delete_relations()
+
+    @action(
+        methods=("get",),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def feed(self, request: WSGIRequest) -> Response:
+        """Лента рецептов авторов, на которых подписан пользователь.
+
+        Выводится постранично по курсору из ленты пользователя
+        (см. `recipes.models.Timeline`), страница ленты выбирается
+        по одному индексу, затем рецепты страницы загружаются по `id`.
+        Вызов метода через url:  */recipes/feed/.
+
+        Args:
+            request (WSGIRequest): Объект запроса.
+
+        Returns:
+            Responce: Рецепты и ссылка на следующую страницу.
+        """
+        self.cursor_ordering = ("-pub_date", "-recipe_id")
+        paginator = KeysetPagination()
+        entries = paginator.paginate_queryset(
+            request.user.timeline.all(), request, self
+        )
+        recipes = self._annotate_user_flags(self.queryset).in_bulk(
+            [entry.recipe_id for entry in entries]
+        )
+        serializer = self.get_serializer(
+            [
+                recipes[entry.recipe_id]
+                for entry in entries
+                if entry.recipe_id in recipes
+            ],
+            many=True,
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        methods=("get",),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_list(self, request: WSGIRequest) -> Response:
+        """Выводит список покупок пользователя.
+
+        Суммы ингредиентов хранятся в таблице и обновляются вместе
+        с корзиной, поэтому список читается одним запросом. Строки
+        формирует `shopping_list_ingredients`, как и для файлов списка,
+        поэтому единицы измерения приводятся к базовым в одном месте.
+        Вызов метода через url:  */recipes/shopping_list/.
+
+        Args:
+            request (WSGIRequest): Объект запроса.
+
+        Returns:
+            Responce: Ингредиенты с суммарным количеством.
+        """
+        serializer = ShoppingListSerializer(
+            shopping_list_ingredients(request.user), many=True
+        )
+        return Response(serializer.data)
+
+    @action(
+        methods=("get",),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        content_negotiation_class=FileContentNegotiation,
+    )
     def download_shopping_cart(self, request: WSGIRequest) -> Response:
-        """Загружает файл *.txt со списком покупок.
+        """Загружает файл со списком покупок.
 
-        Считает сумму ингредиентов в рецептах выбранных для покупки.
-        Возвращает текстовый файл со списком ингредиентов.
+        Суммы ингредиентов читаются из списка покупок пользователя.
+        Формат файла задаётся параметром `format`: `txt` (по умолчанию),
+        `csv`, `json` или `pdf`. Файл формируется по частям по мере
+        чтения списка из базы и отдаётся потоком.
         Вызов метода через url:  */recipes/download_shopping_cart/.
 
         Args:
             request (WSGIRequest): Объект запроса..
 
         Returns:
-            Responce: Ответ с текстовым файлом.
+            Responce: Ответ с файлом.
         """
         user = self.request.user
         if not user.carts.exists():
             return Response(status=HTTP_400_BAD_REQUEST)
 
-        filename = f"{user.username}_shopping_list.txt"
-        shopping_list = create_shoping_list(user)
-        response = HttpResponse(
-            shopping_list, content_type="text.txt; charset=utf-8"
+        file_format = request.query_params.get(
+            UrlQueries.EXPORT_FORMAT.value, "txt"
+        )
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Формат {file_format} не поддерживается."},
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        export = EXPORT_FORMATS[file_format]
+        filename = f"{user.username}_shopping_list.{export.extension}"
+        response = StreamingHttpResponse(
+            export.export(user), content_type=export.content_type
         )
         response["Content-Disposition"] = f"attachment; filename={filename}"
         return response
+
+    @action(
+        methods=("get",),
+        detail=False,
+        url_path="export",
+        permission_classes=(IsAdminUser,),
+    )
+    def export_recipes(self, request: WSGIRequest) -> StreamingHttpResponse:
+        """Выгружает все рецепты в формате NDJSON.
+
+        Рецепты читаются из базы частями и отдаются потоком,
+        по одному рецепту в строке (см. `core.transfer`).
+        Доступно только служебному персоналу.
+        Вызов метода через url:  */recipes/export/.
+
+        Args:
+            request (WSGIRequest): Объект запроса.
+
+        Returns:
+            StreamingHttpResponse: Поток с рецептами.
+        """
+        response = StreamingHttpResponse(
+            export_recipes(), content_type="application/x-ndjson"
+        )
+        response["Content-Disposition"] = "attachment; filename=recipes.ndjson"
+        return response
+
+    @action(
+        methods=("post",),
+        detail=False,
+        url_path="import",
+        permission_classes=(IsAdminUser,),
+    )
+    def import_recipes(self, request: WSGIRequest) -> Response:
+        """Загружает рецепты из тела запроса в формате NDJSON.
+
+        Тело запроса читается построчно, рецепты сохраняются частями
+        в отдельных транзакциях (см. `core.transfer`).
+        Доступно только служебному персоналу.
+        Вызов метода через url:  */recipes/import/.
+
+        Args:
+            request (WSGIRequest): Объект запроса.
+
+        Returns:
+            Responce: Количество добавленных и пропущенных рецептов
+                и сообщения об ошибках.
+        """
+        if request.stream is None:
+            return Response(
+                {"error": "Нет данных для загрузки."},
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        result = import_recipes(request.stream)
+        return Response(result._asdict())
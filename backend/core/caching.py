@@ -0,0 +1,109 @@
+"""Кэш сериализованных ответов и справочников в памяти процесса.
+
+Ответ хранится вместе с версией таблицы, из которой он построен.
+Версию увеличивают сигналы `post_save` и `post_delete` модели
+(см. `core.signals`), после чего ответ строится заново при первом запросе.
+Так как сигналы приходят только в процесс, изменивший данные, запись
+кэша дополнительно устаревает через `Limits.REFERENCE_CACHE_TTL` секунд.
+"""
+from collections import defaultdict
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, NamedTuple
+
+from core.enums import Limits
+
+
+class CachedContent(NamedTuple):
+    version: int
+    created: float
+    content: bytes
+    etag: str
+
+
+class CachedObjects(NamedTuple):
+    version: int
+    created: float
+    objects: dict[int, Any]
+
+
+_versions: dict[str, int] = defaultdict(int)
+_contents: dict[str, CachedContent] = {}
+_objects: dict[str, CachedObjects] = {}
+_lock = Lock()
+
+
+def bump_version(table: str) -> None:
+    """Увеличивает версию таблицы, сбрасывая кэшированные ответы.
+
+    Args:
+        table (str): Название кэшируемого набора данных.
+    """
+    with _lock:
+        _versions[table] += 1
+
+
+def get_cached_content(
+    table: str, build: Callable[[], bytes]
+) -> CachedContent:
+    """Возвращает кэшированный ответ, при необходимости строит его заново.
+
+    ETag вычисляется по содержимому, поэтому совпадает во всех процессах,
+    отдающих одинаковые данные.
+
+    Args:
+        table (str): Название кэшируемого набора данных.
+        build (Callable[[], bytes]): Функция, строящая ответ.
+
+    Returns:
+        CachedContent: Содержимое ответа и его ETag.
+    """
+    version = _versions[table]
+    cached = _contents.get(table)
+    if (
+        cached is not None
+        and cached.version == version
+        and monotonic() - cached.created < Limits.REFERENCE_CACHE_TTL
+    ):
+        return cached
+
+    content = build()
+    cached = CachedContent(
+        version, monotonic(), content, f'"{sha256(content).hexdigest()}"'
+    )
+    with _lock:
+        if _versions[table] == version:
+            _contents[table] = cached
+    return cached
+
+
+def get_cached_objects(
+    table: str, load: Callable[[], dict[int, Any]]
+) -> dict[int, Any]:
+    """Возвращает кэшированный справочник объектов по `id`.
+
+    Кэш сбрасывается той же версией таблицы, что и кэш ответов.
+    Объекты общие для всех запросов процесса и не должны изменяться.
+
+    Args:
+        table (str): Название кэшируемого набора данных.
+        load (Callable[[], dict[int, Any]]): Функция, загружающая объекты.
+
+    Returns:
+        dict[int, Any]: Объекты по `id`.
+    """
+    version = _versions[table]
+    cached = _objects.get(table)
+    if (
+        cached is not None
+        and cached.version == version
+        and monotonic() - cached.created < Limits.REFERENCE_CACHE_TTL
+    ):
+        return cached.objects
+
+    objects = load()
+    with _lock:
+        if _versions[table] == version:
+            _objects[table] = CachedObjects(version, monotonic(), objects)
+    return objects
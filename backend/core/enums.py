@@ -6,6 +6,9 @@ from enum import Enum, IntEnum
 class Tuples(tuple, Enum):
     # Размер сохраняемого изображения рецепта
     RECIPE_IMAGE_SIZE = 500, 500
+    # Размеры уменьшенных вариантов изображения рецепта
+    RECIPE_IMAGE_MEDIUM_SIZE = 320, 320
+    RECIPE_IMAGE_SMALL_SIZE = 160, 160
     # Поиск объектов только с переданным параметром.
     # Например только в избранном: `is_favorited=1`
     SYMBOL_TRUE_SEARCH = "1", "true"
@@ -35,11 +38,48 @@ class Limits(IntEnum):
     MIN_AMOUNT_INGREDIENTS = 1
     # Максимальное количество ингридиентов для рецепта
     MAX_AMOUNT_INGREDIENTS = 32
+    # Размер страницы по умолчанию при постраничном выводе по курсору
+    CURSOR_PAGE_SIZE = 6
+    # Время жизни поискового индекса ингридиентов в памяти процесса (сек.)
+    INGREDIENTS_INDEX_TTL = 300
+    # Максимальное количество результатов нечёткого поиска ингридиентов
+    FUZZY_SEARCH_LIMIT = 10
+    # Время жизни кэша справочных ответов (тэги, ингридиенты) (сек.)
+    REFERENCE_CACHE_TTL = 300
+    # Количество строк, читаемых из базы за раз при потоковой выгрузке
+    EXPORT_CHUNK_SIZE = 500
+    # Максимальный размер загружаемого изображения рецепта (байт)
+    MAX_IMAGE_SIZE = 8 * 1024 * 1024
+    # Максимальная ширина и высота загружаемого изображения (пикс.)
+    MAX_IMAGE_SIDE = 6000
+    # Объём изображения, который хранится в памяти при загрузке (байт),
+    # остаток записывается во временный файл
+    IMAGE_SPOOL_SIZE = 1024 * 1024
+    # Количество символов Base64, декодируемых за раз (кратно 4)
+    BASE64_CHUNK_SIZE = 64 * 1024
+    # Максимальное количество объектов в одном пакетном запросе
+    MAX_BATCH_SIZE = 100
+    # Количество подписчиков, в ленты которых рецепт добавляется за раз
+    FEED_BATCH_SIZE = 1000
+    # Количество последних рецептов автора, добавляемых в ленту при подписке
+    FEED_BACKFILL_SIZE = 100
+    # Количество файлов, удаляемых сборщиком медиафайлов за раз
+    MEDIA_GC_BATCH_SIZE = 500
+    # Минимальный возраст файла без ссылок для удаления, в секундах
+    MEDIA_GC_MIN_AGE = 60 * 60
+    # Количество рецептов, читаемых из базы за раз при выгрузке
+    RECIPES_EXPORT_CHUNK_SIZE = 500
+    # Количество рецептов, загружаемых в одной транзакции
+    RECIPES_IMPORT_BATCH_SIZE = 500
+    # Максимальное количество сообщений об ошибках загрузки рецептов
+    RECIPES_IMPORT_MAX_ERRORS = 20
 
 
 class UrlQueries(str, Enum):
     # Параметр для поиска ингридиентов по вхождению значения в название
     SEARCH_ING_NAME = "name"
+    # Параметр для нечёткого поиска ингридиентов: `fuzzy=1`
+    FUZZY_SEARCH = "fuzzy"
     # Параметр для поиска объектов в списке "избранное"
     FAVORITE = "is_favorited"
     # Параметр для поиска объектов в списке "покупки"
@@ -48,3 +88,10 @@ class UrlQueries(str, Enum):
     AUTHOR = "author"
     # Параметр для поиска объектов по тэгам
     TAGS = "tags"
+    # Количество рецептов каждого автора в списке подписок
+    RECIPES_LIMIT = "recipes_limit"
+    # Формат выгружаемого файла: `txt`, `csv`, `json` или `pdf`
+    EXPORT_FORMAT = "format"
+    # Параметр для постраничного вывода по курсору: `cursor=` - первая
+    # страница, далее значение из ссылки `next`
+    CURSOR = "cursor"
@@ -0,0 +1,108 @@
+"""Потоковая выгрузка списка покупок в разных форматах.
+
+Каждый формат - генератор частей файла, который получает строки
+списка покупок по мере чтения их из базы.
+"""
+import csv
+import json
+from datetime import datetime as dt
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, NamedTuple
+
+from core.pdf import TextPDF
+from core.services import shopping_list_ingredients
+from django.conf import settings
+from foodgram.settings import DATE_TIME_FORMAT
+
+if TYPE_CHECKING:
+    from users.models import MyUser
+
+
+class EchoBuffer:
+    """Буфер, который возвращает записанную строку вместо хранения."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def shopping_list_header(user: "MyUser") -> list[str]:
+    return [
+        "Список покупок для:",
+        "",
+        user.first_name,
+        dt.now().strftime(DATE_TIME_FORMAT),
+        "",
+    ]
+
+
+def shopping_list_lines(user: "MyUser") -> Iterator[str]:
+    """Строки текстового списка покупок.
+
+    Args:
+        user (MyUser): Пользователь, для которого формируется список.
+
+    Yields:
+        str: Очередная строка без перевода строки.
+    """
+    yield from shopping_list_header(user)
+    for ing in shopping_list_ingredients(user):
+        yield f'{ing["name"]}: {ing["amount"]} {ing["measurement"]}'
+    yield ""
+    yield "Посчитано в Foodgram"
+
+
+def export_txt(user: "MyUser") -> Iterator[bytes]:
+    for line in shopping_list_lines(user):
+        yield f"{line}\n".encode()
+
+
+def export_csv(user: "MyUser") -> Iterator[bytes]:
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(("name", "amount", "measurement_unit")).encode()
+    for ing in shopping_list_ingredients(user):
+        yield writer.writerow(
+            (ing["name"], ing["amount"], ing["measurement"])
+        ).encode()
+
+
+def export_json(user: "MyUser") -> Iterator[bytes]:
+    head = json.dumps(
+        {
+            "user": user.username,
+            "date": dt.now().strftime(DATE_TIME_FORMAT),
+        },
+        ensure_ascii=False,
+    )
+    yield f'{head[:-1]}, "ingredients": ['.encode()
+    separator = ""
+    for ing in shopping_list_ingredients(user):
+        item = json.dumps(
+            {
+                "name": ing["name"],
+                "amount": ing["amount"],
+                "measurement_unit": ing["measurement"],
+            },
+            ensure_ascii=False,
+        )
+        yield f"{separator}{item}".encode()
+        separator = ", "
+    yield b"]}"
+
+
+def export_pdf(user: "MyUser") -> Iterator[bytes]:
+    yield from TextPDF(settings.PDF_FONT_PATH).stream(
+        shopping_list_lines(user)
+    )
+
+
+class ExportFormat(NamedTuple):
+    export: Callable[["MyUser"], Iterable[bytes]]
+    content_type: str
+    extension: str
+
+
+EXPORT_FORMATS = {
+    "txt": ExportFormat(export_txt, "text/plain; charset=utf-8", "txt"),
+    "csv": ExportFormat(export_csv, "text/csv; charset=utf-8", "csv"),
+    "json": ExportFormat(export_json, "application/json", "json"),
+    "pdf": ExportFormat(export_pdf, "application/pdf", "pdf"),
+}
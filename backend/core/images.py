@@ -0,0 +1,266 @@
+"""Обработка изображений рецептов вне запроса.
+
+Из загруженного изображения строятся варианты размеров `IMAGE_VARIANTS`
+в форматах `IMAGE_FORMATS` (WebP и JPEG для клиентов без WebP). Варианты
+хранятся рядом с исходным файлом: `<имя>_<размер>.<расширение>`, исходный
+файл уменьшается до полного размера.
+Обработка выполняется в пуле из `settings.IMAGE_WORKERS` процессов
+после фиксации транзакции, в которой сохранён рецепт, поэтому ответ API
+не ждёт Pillow. При `IMAGE_WORKERS = 0` обработка выполняется сразу
+после фиксации в текущем процессе.
+Каждый файл записывается во временный файл в том же каталоге и заменяет
+прежний через `os.replace`, поэтому файл никогда не бывает записан
+частично.
+"""
+import os
+import posixpath
+from base64 import b64decode
+from binascii import Error as Base64Error
+from concurrent.futures import Future, ProcessPoolExecutor
+from logging import getLogger
+from pathlib import Path
+from tempfile import NamedTemporaryFile, SpooledTemporaryFile
+from threading import Lock
+from uuid import uuid4
+
+from core.enums import Limits, Tuples
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db.transaction import on_commit
+from PIL import Image, UnidentifiedImageError
+
+logger = getLogger(__name__)
+
+# Название варианта: максимальные ширина и высота
+IMAGE_VARIANTS: dict[str, tuple[int, int]] = {
+    "small": Tuples.RECIPE_IMAGE_SMALL_SIZE.value,
+    "medium": Tuples.RECIPE_IMAGE_MEDIUM_SIZE.value,
+    "full": Tuples.RECIPE_IMAGE_SIZE.value,
+}
+
+# Пробельные символы, допустимые внутри строки Base64 (переносы строк)
+BASE64_WHITESPACE = " \t\r\n"
+# Название формата: (формат Pillow, расширение файла, параметры записи)
+IMAGE_FORMATS: dict[str, tuple[str, str, dict]] = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 85, "optimize": True}),
+}
+
+# Допустимые форматы загружаемых изображений: расширение файла
+UPLOAD_FORMATS: dict[str, str] = {
+    "JPEG": "jpg",
+    "PNG": "png",
+    "GIF": "gif",
+    "WEBP": "webp",
+}
+
+_executor: ProcessPoolExecutor | None = None
+_lock = Lock()
+
+
+def variant_name(name: str, size: str, image_format: str) -> str:
+    """Имя файла варианта изображения.
+
+    Args:
+        name (str): Имя или путь исходного файла.
+        size (str): Название размера из `IMAGE_VARIANTS`.
+        image_format (str): Название формата из `IMAGE_FORMATS`.
+
+    Returns:
+        str: Имя файла варианта в том же каталоге.
+    """
+    stem, _ = posixpath.splitext(name)
+    _, extension, _ = IMAGE_FORMATS[image_format]
+    return f"{stem}_{size}.{extension}"
+
+
+def variant_names(name: str) -> list[str]:
+    """Имена файлов всех вариантов изображения.
+
+    Args:
+        name (str): Имя или путь исходного файла.
+
+    Returns:
+        list[str]: Имена файлов вариантов.
+    """
+    return [
+        variant_name(name, size, image_format)
+        for size in IMAGE_VARIANTS
+        for image_format in IMAGE_FORMATS
+    ]
+
+
+def image_stem(name: str) -> str:
+    """Имя исходного файла без расширения для файла или его варианта.
+
+    Args:
+        name (str): Имя исходного файла или варианта.
+
+    Returns:
+        str: Имя без расширения и суффикса размера.
+    """
+    stem, _ = posixpath.splitext(name)
+    head, _, size = stem.rpartition("_")
+    return head if head and size in IMAGE_VARIANTS else stem
+
+
+def decode_base64_image(data: str) -> File:
+    """Декодирует изображение из строки Base64 с ограничением памяти.
+
+    Размер изображения проверяется по числу символов Base64 до
+    декодирования, пробелы и переносы строк не учитываются и пропускаются.
+    Строка декодируется частями во временный файл, который хранится
+    в памяти до `Limits.IMAGE_SPOOL_SIZE` байт. Из файла читается только
+    заголовок изображения для проверки формата и размеров, пиксели
+    декодируются позже при обработке (см. `process_image`).
+
+    Args:
+        data (str): Base64, возможно с заголовком `data:<тип>;base64,`.
+
+    Raises:
+        ValidationError: Строка или изображение не прошли проверку.
+
+    Returns:
+        File: Файл изображения со случайным именем.
+    """
+    start = data.find(";base64,", 0, 100)
+    start = 0 if start < 0 else start + len(";base64,")
+    whitespace = str.maketrans("", "", BASE64_WHITESPACE)
+    encoded_size = len(data) - start
+    encoded_size -= sum(data.count(char, start) for char in BASE64_WHITESPACE)
+    if encoded_size // 4 * 3 > Limits.MAX_IMAGE_SIZE:
+        raise ValidationError(
+            "Размер изображения больше "
+            f"{Limits.MAX_IMAGE_SIZE // 1024 // 1024} МБ."
+        )
+    if not encoded_size or encoded_size % 4:
+        raise ValidationError("Загрузите корректное изображение.")
+
+    file = SpooledTemporaryFile(max_size=Limits.IMAGE_SPOOL_SIZE)
+    tail = ""
+    try:
+        for pos in range(start, len(data), Limits.BASE64_CHUNK_SIZE):
+            end = pos + Limits.BASE64_CHUNK_SIZE
+            chunk = tail + data[pos:end].translate(whitespace)
+            # Декодируются только полные группы из 4 символов,
+            # остаток переносится в следующую часть
+            aligned = len(chunk) - len(chunk) % 4
+            file.write(b64decode(chunk[:aligned], validate=True))
+            tail = chunk[aligned:]
+        file.seek(0)
+        with Image.open(file) as image:
+            image_format, (width, height) = image.format, image.size
+    except (Base64Error, UnidentifiedImageError, Image.DecompressionBombError):
+        file.close()
+        raise ValidationError("Загрузите корректное изображение.")
+
+    if image_format not in UPLOAD_FORMATS:
+        file.close()
+        raise ValidationError(f"Формат {image_format} не поддерживается.")
+    if max(width, height) > Limits.MAX_IMAGE_SIDE:
+        file.close()
+        raise ValidationError(
+            "Ширина и высота изображения должны быть не больше "
+            f"{Limits.MAX_IMAGE_SIDE} пикселей."
+        )
+
+    file.seek(0)
+    return File(file, name=f"{uuid4()}.{UPLOAD_FORMATS[image_format]}")
+
+
+def _save_atomic(
+    image: Image.Image, path: Path, image_format: str, **params
+) -> None:
+    with NamedTemporaryFile(
+        dir=path.parent, suffix=path.suffix, delete=False
+    ) as tmp:
+        try:
+            image.save(tmp, format=image_format, **params)
+        except Exception:
+            os.unlink(tmp.name)
+            raise
+    # Временный файл создаётся с правами 0600, а медиафайлы
+    # читает веб-сервер от имени другого пользователя
+    os.chmod(tmp.name, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+    os.replace(tmp.name, path)
+
+
+def _to_rgb(image: Image.Image) -> Image.Image:
+    """Переводит изображение в RGB, прозрачный фон заменяется белым."""
+    if image.mode == "RGB":
+        return image
+    image = image.convert("RGBA")
+    background = Image.new("RGB", image.size, "white")
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def process_image(path: str) -> None:
+    """Строит варианты изображения и уменьшает исходный файл.
+
+    Args:
+        path (str): Путь к файлу изображения.
+    """
+    image_path = Path(path)
+    if not image_path.exists():
+        return
+
+    full_size = IMAGE_VARIANTS["full"]
+    with Image.open(image_path) as image:
+        original_format, original_size = image.format, image.size
+        # JPEG декодируется сразу в уменьшенном масштабе
+        image.draft("RGB", full_size)
+        image.load()
+
+    for size_name, size in IMAGE_VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail(size)
+        for image_format, (pil_format, _, params) in IMAGE_FORMATS.items():
+            _save_atomic(
+                variant if pil_format == "WEBP" else _to_rgb(variant),
+                Path(variant_name(path, size_name, image_format)),
+                pil_format,
+                **params,
+            )
+
+    if original_size[0] > full_size[0] or original_size[1] > full_size[1]:
+        image.thumbnail(full_size)
+        _save_atomic(image, image_path, original_format)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS
+            )
+    return _executor
+
+
+def _log_error(future: Future) -> None:
+    if future.exception() is not None:
+        logger.error(
+            "Не удалось обработать изображение.", exc_info=future.exception()
+        )
+
+
+def _submit(path: str) -> None:
+    if not settings.IMAGE_WORKERS:
+        process_image(path)
+        return
+
+    future = _get_executor().submit(process_image, path)
+    future.add_done_callback(_log_error)
+
+
+def schedule_image_processing(path: str) -> None:
+    """Ставит обработку изображения в очередь пула процессов.
+
+    Задача отправляется после фиксации текущей транзакции.
+
+    Args:
+        path (str): Путь к файлу изображения.
+    """
+    on_commit(lambda: _submit(path))
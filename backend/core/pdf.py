@@ -0,0 +1,262 @@
+"""Потоковая запись документов PDF со строками текста.
+
+Документ выдаётся частями по мере формирования страниц, поэтому
+расход памяти не зависит от количества строк, а первые байты уходят
+клиенту до того, как прочитан весь список. Шрифт TrueType (по умолчанию
+DejaVuSans) встраивается подмножеством средствами ReportLab: коды
+символам назначаются по мере вывода, а подмножества глифов пишутся
+в конце документа вместе с деревом страниц. Поэтому выводится любой
+символ, который есть в шрифте, а размер файла не зависит от размера
+шрифта. Строки длиннее ширины страницы переносятся по словам, слишком
+длинные слова - по символам.
+"""
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, Iterator
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import registerFont
+from reportlab.pdfbase.ttfonts import SUBSETN, TTFont, makeToUnicodeCMap
+
+# Объекты, которые пишутся в конце документа: каталог, дерево страниц
+# и общие ресурсы страниц со ссылками на подмножества шрифта.
+CATALOG_ID, PAGES_ID, RESOURCES_ID = 1, 2, 3
+# `TTFontFile.makeSubset` читает файл шрифта через общий указатель позиции
+_subset_lock = Lock()
+
+
+@lru_cache(maxsize=4)
+def load_font(font_path: str) -> TTFont:
+    """Загружает шрифт TrueType и регистрирует его в ReportLab.
+
+    Результат кэшируется: шрифт читается один раз на процесс.
+
+    Args:
+        font_path (str): Путь к файлу шрифта TrueType.
+
+    Returns:
+        TTFont: Шрифт ReportLab.
+    """
+    font = TTFont(Path(font_path).stem, font_path)
+    registerFont(font)
+    return font
+
+
+class TextPDF:
+    """Формирует документ PDF со строками текста, разбитыми на страницы.
+
+    Экземпляр служит ключом набора кодов символов в шрифте ReportLab,
+    поэтому для каждого документа создаётся новый объект.
+
+    Attrs:
+        font_path (str): Путь к файлу шрифта TrueType.
+        font_size (int): Кегль шрифта.
+        page_size (tuple[float, float]): Размер страницы в пунктах (A4).
+        margin (int): Поля страницы в пунктах.
+
+    Example:
+        pdf = TextPDF("DejaVuSans.ttf")
+        for chunk in pdf.stream(("Первая строка", "Вторая строка")):
+            file.write(chunk)
+    """
+
+    def __init__(
+        self,
+        font_path: str,
+        font_size: int = 12,
+        page_size: tuple[float, float] = A4,
+        margin: int = 50,
+    ) -> None:
+        self.font = load_font(str(font_path))
+        self.font_size = font_size
+        self.page_size = page_size
+        self.margin = margin
+        self.leading = round(font_size * 1.4)
+        self.text_width = page_size[0] - 2 * margin
+        self.lines_per_page = int(page_size[1] - 2 * margin) // self.leading
+
+    def wrap(self, line: str) -> Iterator[str]:
+        """Разбивает строку на части не шире страницы.
+
+        Args:
+            line (str): Строка текста.
+
+        Yields:
+            str: Часть строки. Пустая строка выдаётся как есть.
+        """
+        parts = simpleSplit(
+            line, self.font.fontName, self.font_size, self.text_width
+        )
+        if not parts:
+            yield ""
+        for part in parts:
+            yield from self._split_word(part)
+
+    def _split_word(self, text: str) -> Iterator[str]:
+        # `simpleSplit` не разбивает слово длиннее строки
+        while self._width(text) > self.text_width:
+            end = len(text) - 1
+            while end > 1 and self._width(text[:end]) > self.text_width:
+                end -= 1
+            yield text[:end]
+            text = text[end:]
+        yield text
+
+    def _width(self, text: str) -> float:
+        return self.font.stringWidth(text, self.font_size)
+
+    def stream(self, lines: Iterable[str]) -> Iterator[bytes]:
+        """Выдаёт документ PDF по частям: заголовок, страницы, шрифт.
+
+        Args:
+            lines (Iterable[str]): Строки текста.
+
+        Yields:
+            bytes: Очередная часть документа.
+        """
+        self._offsets: dict[int, int] = {}
+        self._position = 0
+        self._next_id = RESOURCES_ID + 1
+        pages: list[int] = []
+
+        try:
+            yield self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            page: list[str] = []
+            for line in lines:
+                for part in self.wrap(line):
+                    page.append(part)
+                    if len(page) == self.lines_per_page:
+                        pages.append(self._reserve())
+                        yield self._page(pages[-1], page)
+                        page = []
+            if page or not pages:
+                pages.append(self._reserve())
+                yield self._page(pages[-1], page)
+
+            yield self._fonts()
+            kids = " ".join(f"{page_id} 0 R" for page_id in pages)
+            yield self._object(
+                PAGES_ID,
+                f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>",
+            )
+            yield self._object(
+                CATALOG_ID, f"<< /Type /Catalog /Pages {PAGES_ID} 0 R >>"
+            )
+            yield self._xref()
+        finally:
+            self.font.state.pop(self, None)
+
+    def _reserve(self) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write(self, data: bytes) -> bytes:
+        self._position += len(data)
+        return data
+
+    def _object(self, obj_id: int, body: str, stream: bytes = b"") -> bytes:
+        self._offsets[obj_id] = self._position
+        data = f"{obj_id} 0 obj\n{body}\n".encode()
+        if stream:
+            data += b"stream\n" + stream + b"\nendstream\n"
+        return self._write(data + b"endobj\n")
+
+    def _stream(self, obj_id: int, content: bytes, **extra) -> bytes:
+        compressed = zlib.compress(content)
+        keys = "".join(f" /{key} {value}" for key, value in extra.items())
+        return self._object(
+            obj_id,
+            f"<< /Length {len(compressed)} /Filter /FlateDecode{keys} >>",
+            compressed,
+        )
+
+    def _text(self, line: str) -> str:
+        # Строка делится на части по подмножествам шрифта,
+        # у каждого подмножества свой ресурс `/F<номер>`
+        return " ".join(
+            f"/F{subset} {self.font_size} Tf <{codes.hex()}> Tj"
+            for subset, codes in self.font.splitString(line, self)
+        )
+
+    def _page(self, page_id: int, lines: list[str]) -> bytes:
+        top = self.page_size[1] - self.margin - self.font_size
+        text = "\n".join(f"{self._text(line)} T*" for line in lines)
+        content_id = self._reserve()
+        content = self._stream(
+            content_id,
+            f"BT {self.leading} TL {self.margin} {top} Td\n{text}\nET"
+            .encode(),
+        )
+        width, height = self.page_size
+        return content + self._object(
+            page_id,
+            f"<< /Type /Page /Parent {PAGES_ID} 0 R "
+            f"/MediaBox [0 0 {width} {height}] "
+            f"/Resources {RESOURCES_ID} 0 R /Contents {content_id} 0 R >>",
+        )
+
+    def _fonts(self) -> bytes:
+        face = self.font.face
+        state = self.font._assignState(self)
+        chunks, fonts = [], []
+        for number, subset in enumerate(state.subsets):
+            name = (
+                SUBSETN(number) + b"+" + face.name + face.subfontNameX
+            ).decode("latin-1")
+            font_id, descriptor_id = self._reserve(), self._reserve()
+            file_id, cmap_id = self._reserve(), self._reserve()
+            fonts.append(f"/F{number} {font_id} 0 R")
+            widths = " ".join(str(face.getCharWidth(code)) for code in subset)
+            chunks.append(
+                self._object(
+                    font_id,
+                    f"<< /Type /Font /Subtype /TrueType /BaseFont /{name} "
+                    f"/FirstChar 0 /LastChar {len(subset) - 1} "
+                    f"/Widths [{widths}] /FontDescriptor {descriptor_id} 0 R "
+                    f"/ToUnicode {cmap_id} 0 R >>",
+                )
+            )
+            bbox = " ".join(map(str, face.bbox))
+            chunks.append(
+                self._object(
+                    descriptor_id,
+                    f"<< /Type /FontDescriptor /FontName /{name} /Flags 4 "
+                    f"/FontBBox [{bbox}] /ItalicAngle {face.italicAngle} "
+                    f"/Ascent {face.ascent} /Descent {face.descent} "
+                    f"/CapHeight {face.capHeight} /StemV {face.stemV} "
+                    f"/FontFile2 {file_id} 0 R >>",
+                )
+            )
+            with _subset_lock:
+                font_file = face.makeSubset(subset)
+            chunks.append(
+                self._stream(file_id, font_file, Length1=len(font_file))
+            )
+            cmap = makeToUnicodeCMap(name, subset).encode()
+            chunks.append(self._stream(cmap_id, cmap))
+        chunks.append(
+            self._object(
+                RESOURCES_ID, f"<< /Font << {' '.join(fonts)} >> >>"
+            )
+        )
+        return b"".join(chunks)
+
+    def _xref(self) -> bytes:
+        size = self._next_id
+        xref_position = self._position
+        entries = ["0000000000 65535 f \n"]
+        entries.extend(
+            f"{self._offsets[obj_id]:010d} 00000 n \n"
+            for obj_id in range(1, size)
+        )
+        return self._write(
+            (
+                f"xref\n0 {size}\n{''.join(entries)}"
+                f"trailer\n<< /Size {size} /Root {CATALOG_ID} 0 R >>\n"
+                f"startxref\n{xref_position}\n%%EOF\n"
+            ).encode()
+        )
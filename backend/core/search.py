@@ -0,0 +1,282 @@
+"""Поисковые индексы в памяти процесса.
+"""
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from heapq import nsmallest
+from operator import itemgetter
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Iterable, NamedTuple
+
+from core.enums import Limits
+from django.apps import apps
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+
+# Символ, который больше любого другого: граница диапазона по префиксу.
+MAX_CHAR = chr(0x10FFFF)
+# Слова для разбиения на триграммы.
+WORDS = re.compile(r"[^\W_]+")
+# Минимальное сходство для нечёткого поиска
+# (совпадает с `pg_trgm.similarity_threshold` по умолчанию).
+TRIGRAM_SIMILARITY = 0.3
+
+
+class IndexSnapshot(NamedTuple):
+    built_at: float
+    keys: tuple[str, ...]
+    items: tuple[Any, ...]
+
+
+class TrigramSnapshot(NamedTuple):
+    built_at: float
+    keys: tuple[str, ...]
+    items: tuple[Any, ...]
+    sizes: tuple[int, ...]
+    postings: dict[str, tuple[int, ...]]
+
+
+class MemoryIndex:
+    """Базовый класс индекса, хранимого в памяти процесса.
+
+    Данные загружаются функцией `loader` при первом обращении и после
+    сброса методом `invalidate()`. Если задан `ttl`, индекс дополнительно
+    перестраивается по истечении этого времени, чтобы подхватить изменения,
+    сделанные в других процессах. Наследники реализуют метод `_build()`.
+
+    Индекс хранится неизменяемым снимком, который заменяется одним
+    присваиванием. Поиск берёт ссылку на снимок один раз, поэтому
+    перестроение в другом потоке не смешивает старые и новые данные.
+
+    Attrs:
+        loader (Callable[[], Iterable[tuple[str, Any]]]):
+            Функция, возвращающая пары (ключ, объект).
+        ttl (float | None):
+            Время жизни индекса в секундах. None - бессрочно.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[tuple[str, Any]]],
+        ttl: float | None = None,
+    ) -> None:
+        self.loader = loader
+        self.ttl = ttl
+        self._snapshot: IndexSnapshot | None = None
+        self._lock = Lock()
+
+    def invalidate(self) -> None:
+        """Сбрасывает индекс, он будет построен заново при обращении."""
+        self._snapshot = None
+
+    def _is_fresh(self, snapshot: IndexSnapshot | None) -> bool:
+        if snapshot is None:
+            return False
+        return self.ttl is None or monotonic() - snapshot.built_at < self.ttl
+
+    def build(self) -> IndexSnapshot:
+        """Загружает данные, строит и подменяет снимок индекса.
+
+        Returns:
+            IndexSnapshot: Новый снимок индекса.
+        """
+        pairs = sorted(
+            ((key.lower(), item) for key, item in self.loader()),
+            key=itemgetter(0),
+        )
+        snapshot = self._build(
+            tuple(key for key, _ in pairs), tuple(item for _, item in pairs)
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+    def _build(
+        self, keys: tuple[str, ...], items: tuple[Any, ...]
+    ) -> IndexSnapshot:
+        """Строит снимок индекса по отсортированным ключам."""
+        return IndexSnapshot(monotonic(), keys, items)
+
+    def _current(self) -> IndexSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if not self._is_fresh(snapshot):
+                snapshot = self.build()
+        return snapshot
+
+    def all(self) -> list[Any]:
+        """Все объекты индекса в порядке сортировки ключей."""
+        return list(self._current().items)
+
+
+class PrefixIndex(MemoryIndex):
+    """Индекс строк для поиска по началу и по вхождению.
+
+    Ключи хранятся в отсортированном списке: совпадения по началу строки
+    находятся двоичным поиском, совпадения в середине - проходом по списку.
+
+    Example:
+        index = PrefixIndex(lambda: (("мёд", 1), ("мука", 2)))
+        index.search("м")  # [2, 1]
+    """
+
+    def search(self, query: str) -> list[Any]:
+        """Ищет объекты, ключ которых содержит строку `query`.
+
+        Сначала идут совпадения по началу ключа, затем - по вхождению
+        в середину. Внутри групп сохраняется порядок сортировки ключей.
+
+        Args:
+            query (str): Искомая строка.
+
+        Returns:
+            list[Any]: Найденные объекты.
+        """
+        snapshot = self._current()
+        keys, items = snapshot.keys, snapshot.items
+        query = query.lower()
+
+        start = bisect_left(keys, query)
+        stop = bisect_left(keys, query + MAX_CHAR, start)
+        found = list(items[start:stop])
+        found.extend(
+            item
+            for idx, (key, item) in enumerate(zip(keys, items))
+            if query in key and not start <= idx < stop
+        )
+        return found
+
+
+def trigrams(text: str) -> set[str]:
+    """Разбивает строку на триграммы по правилам расширения pg_trgm.
+
+    Каждое слово приводится к нижнему регистру и дополняется двумя
+    пробелами в начале и одним в конце.
+
+    Args:
+        text (str): Исходная строка.
+
+    Returns:
+        set[str]: Множество триграмм.
+    """
+    grams = set()
+    for word in WORDS.findall(text.lower()):
+        word = f"  {word} "
+        grams.update(word[idx:idx + 3] for idx in range(len(word) - 2))
+    return grams
+
+
+class TrigramIndex(MemoryIndex):
+    """Индекс для нечёткого поиска по сходству триграмм.
+
+    Для каждой триграммы хранится список позиций ключей, в которых она
+    встречается. Сходство считается как в pg_trgm: отношение количества
+    общих триграмм к количеству триграмм в объединении.
+
+    Example:
+        index = TrigramIndex(lambda: (("молоко", 1), ("мука", 2)))
+        index.search("малоко")  # [1]
+    """
+
+    def _build(
+        self, keys: tuple[str, ...], items: tuple[Any, ...]
+    ) -> TrigramSnapshot:
+        sizes = []
+        postings = defaultdict(list)
+        for idx, key in enumerate(keys):
+            grams = trigrams(key)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(idx)
+        return TrigramSnapshot(
+            monotonic(),
+            keys,
+            items,
+            tuple(sizes),
+            {gram: tuple(idxs) for gram, idxs in postings.items()},
+        )
+
+    def search(
+        self,
+        query: str,
+        limit: int = Limits.FUZZY_SEARCH_LIMIT.value,
+        threshold: float = TRIGRAM_SIMILARITY,
+    ) -> list[Any]:
+        """Ищет объекты, ключи которых похожи на строку `query`.
+
+        Args:
+            query (str): Искомая строка.
+            limit (int): Максимальное количество результатов.
+            threshold (float): Минимальное сходство от 0 до 1.
+
+        Returns:
+            list[Any]: Найденные объекты по убыванию сходства.
+        """
+        snapshot = self._current()
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(snapshot.postings.get(gram, ()))
+
+        scored = []
+        for idx, common in shared.items():
+            score = common / (len(grams) + snapshot.sizes[idx] - common)
+            if score >= threshold:
+                scored.append((-score, snapshot.keys[idx], idx))
+
+        return [snapshot.items[idx] for *_, idx in nsmallest(limit, scored)]
+
+
+def load_ingredients() -> Iterable[tuple[str, Any]]:
+    """Загружает ингредиенты для индекса одним запросом.
+
+    Returns:
+        Iterable[tuple[str, Ingredient]]: Пары (название, ингредиент).
+    """
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    return (
+        (name, Ingredient(id=pk, name=name, measurement_unit=unit))
+        for pk, name, unit in Ingredient.objects.values_list(
+            "id", "name", "measurement_unit"
+        )
+    )
+
+
+ingredients_index = PrefixIndex(
+    load_ingredients, ttl=Limits.INGREDIENTS_INDEX_TTL.value
+)
+ingredients_trigrams = TrigramIndex(
+    load_ingredients, ttl=Limits.INGREDIENTS_INDEX_TTL.value
+)
+
+
+def fuzzy_search_ingredients(
+    name: str, limit: int = Limits.FUZZY_SEARCH_LIMIT.value
+) -> list:
+    """Нечёткий поиск ингредиентов по названию.
+
+    На PostgreSQL используется расширение pg_trgm и GIN-индекс по названию,
+    на остальных базах - индекс триграмм в памяти процесса.
+
+    Args:
+        name (str): Искомое название.
+        limit (int): Максимальное количество результатов.
+
+    Returns:
+        list[Ingredient]: Найденные ингредиенты по убыванию сходства.
+    """
+    if connection.vendor != "postgresql":
+        return ingredients_trigrams.search(name, limit)
+
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    return list(
+        Ingredient.objects.filter(name__trigram_similar=name)
+        .annotate(similarity=TrigramSimilarity("name", name))
+        .order_by("-similarity", "name")[:limit]
+    )
@@ -1,18 +1,74 @@
 """Модуль вспомогательных функций.
 """
-from datetime import datetime as dt
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
 from urllib.parse import unquote
 
+from core.caching import bump_version
+from core.enums import Limits
+from core.search import ingredients_index, ingredients_trigrams
+from core.units import base_amount, base_unit
 from django.apps import apps
-from django.db.models import F, Sum
-from foodgram.settings import DATE_TIME_FORMAT
-from recipes.models import AmountIngredient, Recipe
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.db.models import (
+    Count,
+    F,
+    Field,
+    IntegerField,
+    Model,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Sum,
+    Window,
+    prefetch_related_objects,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Coalesce, Greatest, RowNumber
+from django.db.transaction import atomic
+from recipes.models import (
+    AmountIngredient,
+    Carts,
+    Favorites,
+    Recipe,
+    ReleasedImage,
+    ShoppingList,
+    Timeline,
+)
 
 if TYPE_CHECKING:
+    from django.db.backends.base.base import BaseDatabaseWrapper
     from recipes.models import Ingredient
     from users.models import MyUser
 
+# Связанные объекты, необходимые для вывода рецептов через RecipeSerializer.
+# Все ингредиенты и тэги страницы загружаются двумя запросами.
+RECIPE_RELATIONS = (
+    "tags",
+    Prefetch(
+        "ingredient",
+        queryset=AmountIngredient.objects.select_related(
+            "ingredients"
+        ).order_by("ingredients__name"),
+    ),
+)
+
+
+def prefetch_recipe_relations(*recipes: Recipe) -> None:
+    """Загружает тэги и ингредиенты для переданных рецептов.
+
+    Ранее загруженные связанные объекты сбрасываются, поэтому функцию можно
+    вызывать после изменения рецепта.
+
+    Args:
+        recipes (Recipe): Рецепты, для которых загружаются связи.
+    """
+    for recipe in recipes:
+        recipe.__dict__.pop("_prefetched_objects_cache", None)
+
+    prefetch_related_objects(recipes, *RECIPE_RELATIONS)
+
 
 def recipe_ingredients_set(
     recipe: Recipe, ingredients: dict[int, tuple["Ingredient", int]]
@@ -40,34 +96,540 @@ def recipe_ingredients_set(
     AmountIngredient.objects.bulk_create(objs)
 
 
-def create_shoping_list(user: "MyUser") -> str:
-    """Сфомировать список ингридкетов для покупки.
+def recipe_ingredients_update(
+    recipe: Recipe, ingredients: dict[int, tuple["Ingredient", int]]
+) -> None:
+    """Приводит ингредиенты рецепта к переданному составу.
+
+    Сравнивает сохранённые ингредиенты с переданными: новые добавляются
+    одним запросом INSERT, изменённые количества - одним UPDATE,
+    удалённые - одним DELETE. Неизменённые строки не затрагиваются.
+    Если состав изменился, пересчитываются списки покупок пользователей,
+    у которых рецепт в корзине.
 
     Args:
-        user (MyUser):
-            Пользователь, для которго будет создаваться список.
+        recipe (Recipe):
+            Изменяемый рецепт.
+        ingridients (dict[int, tuple[Ingredient, int]]):
+            Ингридиенты и их количество.
+    """
+    stored = {link.ingredients_id: link for link in recipe.ingredient.all()}
+    created, changed = [], []
+    for ingredient, amount in ingredients.values():
+        link = stored.pop(ingredient.pk, None)
+        if link is None:
+            created.append(
+                AmountIngredient(
+                    recipe=recipe, ingredients=ingredient, amount=amount
+                )
+            )
+        elif link.amount != amount:
+            link.amount = amount
+            changed.append(link)
+
+    if not (created or changed or stored):
+        return
+
+    cart_users = list(
+        Carts.objects.filter(recipe=recipe).values_list("user", flat=True)
+    )
+    change_shopping_lists((recipe.pk,), cart_users, -1)
+    if stored:
+        AmountIngredient.objects.filter(
+            pk__in=[link.pk for link in stored.values()]
+        ).delete()
+    AmountIngredient.objects.bulk_update(changed, ("amount",))
+    AmountIngredient.objects.bulk_create(created)
+    change_shopping_lists((recipe.pk,), cart_users, 1)
+
+
+def author_recipes(
+    author_ids: Iterable[int], limit: int | None = None
+) -> Prefetch:
+    """Подгрузка последних рецептов авторов одним запросом.
+
+    Ограничение количества рецептов каждого автора выполняется в базе:
+    рецепты нумеруются функцией `ROW_NUMBER()` в пределах автора
+    от новых к старым, выбираются строки с номером не больше `limit`.
+
+    Args:
+        author_ids (Iterable[int]): `id` авторов.
+        limit (int | None): Сколько рецептов автора загрузить.
+            Если None - загружаются все рецепты.
+
+    Returns:
+        Prefetch: Подгрузка для связи `recipes` авторов.
+    """
+    ordering = (F("pub_date").desc(), F("id").desc())
+    recipes = Recipe.objects.filter(author__in=author_ids)
+    if limit is not None:
+        ranked = (
+            recipes.annotate(
+                row_number=Window(
+                    RowNumber(), partition_by=F("author"), order_by=ordering
+                )
+            )
+            .order_by()
+            .values("id", "row_number")
+        )
+        sql, params = ranked.query.sql_with_params()
+        recipes = recipes.filter(
+            id__in=RawSQL(
+                f"SELECT id FROM ({sql}) ranked WHERE row_number <= %s",
+                (*params, limit),
+            )
+        )
+    return Prefetch("recipes", queryset=recipes.order_by(*ordering))
+
+
+def subscribed_authors(user: "MyUser", author_ids: set[int]) -> set[int]:
+    """Определяет, на кого из переданных авторов подписан пользователь.
+
+    Args:
+        user (MyUser): Пользователь, подписки которого проверяются.
+        author_ids (set[int]): `id` проверяемых авторов.
 
     Returns:
-        str:
-            Список продуктов с указанием необходимого количества.
+        set[int]: `id` авторов, на которых подписан пользователь.
+    """
+    if user.is_anonymous or not author_ids:
+        return set()
+
+    return set(
+        user.subscriptions.filter(author__in=author_ids).values_list(
+            "author_id", flat=True
+        )
+    )
+
+
+def change_counter(
+    model: type[Model], pk: int | None, field: str, delta: int
+) -> None:
+    """Изменяет хранимый счётчик объекта одним запросом UPDATE.
+
+    Значение вычисляется в базе через F-выражение, поэтому параллельные
+    изменения не теряются.
+
+    Args:
+        model (type[Model]): Модель объекта со счётчиком.
+        pk (int | None): `id` объекта. Если None - ничего не делает.
+        field (str): Название поля счётчика.
+        delta (int): На сколько изменить счётчик.
     """
-    shopping_list = [
-        f"Список покупок для:\n\n{user.first_name}\n"
-        f"{dt.now().strftime(DATE_TIME_FORMAT)}\n"
+    if pk is None:
+        return
+
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def change_counters(
+    model: type[Model], pks: Iterable[int], field: str, delta: int
+) -> None:
+    """Изменяет хранимый счётчик нескольких объектов одним запросом UPDATE.
+
+    Args:
+        model (type[Model]): Модель объектов со счётчиком.
+        pks (Iterable[int]): `id` объектов.
+        field (str): Название поля счётчика.
+        delta (int): На сколько изменить счётчик каждого объекта.
+    """
+    pks = list(pks)
+    if pks:
+        model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+
+
+def insert_ignore(obj: Model) -> bool:
+    """Сохраняет новый объект, если он не нарушает уникальность.
+
+    Выполняет один запрос `INSERT ... ON CONFLICT DO NOTHING`. В отличие
+    от перехвата `IntegrityError` повтор не прерывает транзакцию,
+    в которой выполняется запрос.
+
+    Args:
+        obj (Model): Несохранённый объект.
+
+    Returns:
+        bool: Объект добавлен в базу.
+    """
+    return bool(bulk_insert_ignore((obj,), "pk"))
+
+
+def insert_link(link: Model, field: str) -> bool:
+    """Сохраняет связь, если объект, на который она ссылается, существует.
+
+    Выполняет один запрос `INSERT ... SELECT ... FROM <таблица объекта>
+    WHERE id = %s ON CONFLICT DO NOTHING RETURNING`: существование
+    объекта проверяет сам INSERT, отдельный SELECT не нужен.
+
+    Args:
+        link (Model): Несохранённая связь.
+        field (str): Внешний ключ связи, указывающий на объект.
+
+    Returns:
+        bool: Связь добавлена. False - связь уже есть или объекта нет.
+    """
+    link_field = link._meta.get_field(field)
+    target = link_field.target_field
+    connection = connections[router.db_for_write(link._meta.model)]
+    qn = connection.ops.quote_name
+    fields, params = _insert_values((link,), connection)
+    source = "SELECT {} FROM {} WHERE {} = %s".format(
+        ", ".join(["%s"] * len(fields)),
+        qn(target.model._meta.db_table),
+        qn(target.column),
+    )
+    params.append(getattr(link, link_field.attname))
+    return bool(_insert_ignore(connection, fields, source, params, "pk"))
+
+
+def bulk_insert_ignore(objs: Iterable[Model], returning: str) -> list:
+    """Сохраняет новые объекты, пропуская нарушающие уникальность.
+
+    Выполняет один запрос `INSERT ... ON CONFLICT DO NOTHING RETURNING`.
+    База возвращает только действительно добавленные строки, поэтому
+    результат верен и при параллельном добавлении тех же объектов.
+
+    Args:
+        objs (Iterable[Model]): Несохранённые объекты одной модели.
+        returning (str): Поле, значения которого вернуть.
+
+    Returns:
+        list: Значения поля `returning` добавленных объектов.
+    """
+    objs = list(objs)
+    if not objs:
+        return []
+
+    connection = connections[router.db_for_write(objs[0]._meta.model)]
+    fields, params = _insert_values(objs, connection)
+    row = "({})".format(", ".join(["%s"] * len(fields)))
+    source = "VALUES {}".format(", ".join([row] * len(objs)))
+    return _insert_ignore(connection, fields, source, params, returning)
+
+
+def bulk_delete_links(
+    model: type[Model], field: str, user_id: int, obj_ids: Iterable[int]
+) -> list[int]:
+    """Удаляет связи пользователя с несколькими объектами.
+
+    Выполняет один запрос `DELETE ... WHERE user_id = %s AND <поле> IN
+    (...) RETURNING <поле>`. База возвращает только действительно
+    удалённые связи, поэтому результат верен и при параллельном удалении.
+
+    Args:
+        model (type[Model]): Модель связи с полем `user`.
+        field (str): Внешний ключ связи, указывающий на объект.
+        user_id (int): `id` пользователя.
+        obj_ids (Iterable[int]): `id` объектов.
+
+    Returns:
+        list[int]: `id` объектов, связи с которыми удалены.
+    """
+    obj_ids = list(obj_ids)
+    if not obj_ids:
+        return []
+
+    meta = model._meta
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    link_field = meta.get_field(field)
+    returning_sql, _ = connection.ops.return_insert_columns((link_field,))
+    sql = "DELETE FROM {} WHERE {} = %s AND {} IN ({}) {}".format(
+        qn(meta.db_table),
+        qn(meta.get_field("user").column),
+        qn(link_field.column),
+        ", ".join(["%s"] * len(obj_ids)),
+        returning_sql,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, *obj_ids])
+        return [value for value, in cursor.fetchall()]
+
+
+def _insert_values(
+    objs: Sequence[Model], connection: "BaseDatabaseWrapper"
+) -> tuple[list[Field], list]:
+    fields = [
+        field
+        for field in objs[0]._meta.concrete_fields
+        if not field.primary_key
+    ]
+    params = [
+        field.get_db_prep_save(field.pre_save(obj, True), connection)
+        for obj in objs
+        for field in fields
     ]
-    Ingredient = apps.get_model("recipes", "Ingredient")
-    ingredients = (
-        Ingredient.objects.filter(recipe__recipe__in_carts__user=user)
-        .values("name", measurement=F("measurement_unit"))
-        .annotate(amount=Sum("recipe__amount"))
+    return fields, params
+
+
+def _insert_ignore(
+    connection: "BaseDatabaseWrapper",
+    fields: list[Field],
+    source: str,
+    params: list,
+    returning: str,
+) -> list:
+    # `source` - VALUES или SELECT со строками для столбцов `fields`
+    meta = fields[0].model._meta
+    qn = connection.ops.quote_name
+    on_conflict = connection.ops.on_conflict_suffix_sql(
+        fields, OnConflict.IGNORE, None, None
+    )
+    returning_sql, _ = connection.ops.return_insert_columns(
+        (meta.pk if returning == "pk" else meta.get_field(returning),)
     )
-    ing_list = (
-        f'{ing["name"]}: {ing["amount"]} {ing["measurement"]}'
-        for ing in ingredients
+    sql = "{} {} ({}) {} {} {}".format(
+        connection.ops.insert_statement(on_conflict=OnConflict.IGNORE),
+        qn(meta.db_table),
+        ", ".join(qn(field.column) for field in fields),
+        source,
+        on_conflict,
+        returning_sql,
     )
-    shopping_list.extend(ing_list)
-    shopping_list.append("\nПосчитано в Foodgram")
-    return "\n".join(shopping_list)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [value for value, in cursor.fetchall()]
+
+
+def count_links(model: type[Model], field: str) -> Coalesce:
+    """Подзапрос с количеством объектов `model`, ссылающихся на строку.
+
+    Args:
+        model (type[Model]): Модель связей.
+        field (str): Поле связи, указывающее на объект внешнего запроса.
+
+    Returns:
+        Coalesce: Выражение для `update()` или `annotate()`.
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+@atomic
+def recount_counters() -> dict[str, int]:
+    """Пересчитывает все хранимые счётчики и списки покупок.
+
+    Returns:
+        dict[str, int]: Количество обновлённых строк по моделям.
+    """
+    User = get_user_model()
+    Subscriptions = apps.get_model("users", "Subscriptions")
+
+    recipes = Recipe.objects.update(
+        favorites_count=count_links(Favorites, "recipe")
+    )
+    users = User.objects.update(
+        recipes_count=count_links(Recipe, "author"),
+        followers_count=count_links(Subscriptions, "author"),
+    )
+    shopping_lists = rebuild_shopping_lists()
+    return {
+        "recipes": recipes,
+        "users": users,
+        "shopping_lists": shopping_lists,
+    }
+
+
+def change_shopping_lists(
+    recipe_ids: Iterable[int], user_ids: Iterable[int], sign: int
+) -> None:
+    """Добавляет ингредиенты рецептов в списки покупок или вычитает их.
+
+    Количество меняется в базе одним запросом UPDATE для всех
+    пользователей и ингредиентов, количества одного ингредиента
+    из разных рецептов суммируются. Недостающие строки списка создаются
+    заранее, строки с нулевым количеством удаляются.
+    Вызывается в одной транзакции с изменением корзины или рецепта.
+
+    Args:
+        recipe_ids (Iterable[int]): `id` рецептов.
+        user_ids (Iterable[int]): `id` владельцев корзин с рецептами.
+        sign (int): 1 - добавить ингредиенты, -1 - вычесть.
+    """
+    recipe_ids, user_ids = list(recipe_ids), list(user_ids)
+    if not (recipe_ids and user_ids):
+        return
+
+    amounts = AmountIngredient.objects.filter(recipe__in=recipe_ids)
+    if sign > 0:
+        ingredient_ids = set(amounts.values_list("ingredients", flat=True))
+        ShoppingList.objects.bulk_create(
+            (
+                ShoppingList(user_id=user_id, ingredient_id=ingredient_id)
+                for user_id in user_ids
+                for ingredient_id in ingredient_ids
+            ),
+            ignore_conflicts=True,
+        )
+
+    lists = ShoppingList.objects.filter(
+        user__in=user_ids, ingredient__in=amounts.values("ingredients")
+    )
+    amount = Subquery(
+        amounts.filter(ingredients=OuterRef("ingredient"))
+        .order_by()
+        .values("ingredients")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    lists.update(
+        amount=Greatest(
+            F("amount") + sign * amount, 0, output_field=IntegerField()
+        )
+    )
+    if sign < 0:
+        lists.filter(amount=0).delete()
+
+
+def rebuild_shopping_lists() -> int:
+    """Заново заполняет списки покупок по корзинам пользователей.
+
+    Returns:
+        int: Количество строк в списках покупок.
+    """
+    totals = (
+        AmountIngredient.objects.filter(recipe__in_carts__isnull=False)
+        .values("recipe__in_carts__user", "ingredients")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+    ShoppingList.objects.all().delete()
+    created = ShoppingList.objects.bulk_create(
+        (
+            ShoppingList(
+                user_id=row["recipe__in_carts__user"],
+                ingredient_id=row["ingredients"],
+                amount=row["total"],
+            )
+            for row in totals.iterator(chunk_size=Limits.EXPORT_CHUNK_SIZE)
+        ),
+        batch_size=Limits.EXPORT_CHUNK_SIZE,
+    )
+    return len(created)
+
+
+def shopping_list_ingredients(user: "MyUser") -> Iterator[dict]:
+    """Ингредиенты из списка покупок пользователя.
+
+    Суммы уже посчитаны в таблице ShoppingList. Одноимённые ингредиенты
+    в кратных единицах (`кг` и `г`, `л` и `мл`) приводятся к базовой
+    единице и суммируются в том же запросе (см. `core.units`).
+    Строки читаются из базы частями (на PostgreSQL - через серверный
+    курсор), поэтому список не загружается в память целиком.
+
+    Args:
+        user (MyUser):
+            Пользователь, для которго формируется список.
+
+    Yields:
+        dict: Название, единицы измерения (`measurement`)
+        и количество (`amount`) ингредиента.
+    """
+    unit = "ingredient__measurement_unit"
+    return (
+        ShoppingList.objects.filter(user=user, amount__gt=0)
+        .values(name=F("ingredient__name"), measurement=base_unit(unit))
+        .annotate(amount=Sum(base_amount("amount", unit)))
+        .order_by("name", "measurement")
+        .iterator(chunk_size=Limits.EXPORT_CHUNK_SIZE)
+    )
+
+
+def fan_out_recipe(recipe: Recipe) -> None:
+    """Добавляет опубликованный рецепт в ленты подписчиков автора.
+
+    Подписчики читаются частями по `Limits.FEED_BATCH_SIZE`, строки
+    лент каждой части добавляются одним запросом INSERT.
+
+    Args:
+        recipe (Recipe): Опубликованный рецепт.
+    """
+    Subscriptions = apps.get_model("users", "Subscriptions")
+    followers = (
+        Subscriptions.objects.filter(author=recipe.author_id)
+        .order_by("pk")
+        .values_list("pk", "user")
+    )
+    last_pk = 0
+    while batch := list(
+        followers.filter(pk__gt=last_pk)[: Limits.FEED_BATCH_SIZE]
+    ):
+        Timeline.objects.bulk_create(
+            (
+                Timeline(
+                    user_id=user_id,
+                    recipe_id=recipe.pk,
+                    author_id=recipe.author_id,
+                    pub_date=recipe.pub_date,
+                )
+                for _, user_id in batch
+            ),
+            ignore_conflicts=True,
+        )
+        last_pk = batch[-1][0]
+
+
+def backfill_timeline(user_id: int, author_id: int) -> None:
+    """Добавляет в ленту пользователя последние рецепты автора.
+
+    Вызывается при подписке на автора.
+
+    Args:
+        user_id (int): `id` подписчика.
+        author_id (int): `id` автора.
+    """
+    recipes = (
+        Recipe.objects.filter(author=author_id)
+        .order_by("-pub_date", "-id")
+        .values_list("id", "pub_date")[: Limits.FEED_BACKFILL_SIZE]
+    )
+    Timeline.objects.bulk_create(
+        (
+            Timeline(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for recipe_id, pub_date in recipes
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def clear_timeline(user_id: int, author_id: int) -> None:
+    """Удаляет из ленты пользователя рецепты автора.
+
+    Вызывается при отписке от автора.
+
+    Args:
+        user_id (int): `id` подписчика.
+        author_id (int): `id` автора.
+    """
+    Timeline.objects.filter(user=user_id, author=author_id).delete()
+
+
+def enqueue_image_release(name: str) -> None:
+    """Ставит файл изображения в очередь на освобождение.
+
+    Выполняется один INSERT в текущей транзакции, файл не затрагивается:
+    одинаковые изображения хранятся одним файлом (см. `core.storage`),
+    и ссылка на него может появиться в незафиксированной транзакции.
+    Очередь обрабатывает команда `collect_media_garbage`.
+
+    Args:
+        name (str): Имя файла в хранилище изображений.
+    """
+    if name:
+        ReleasedImage.objects.create(name=name)
 
 
 def maybe_incorrect_layout(url_string: str) -> str:
@@ -87,3 +649,23 @@ def maybe_incorrect_layout(url_string: str) -> str:
         return unquote(url_string).lower()
 
     return url_string.translate(equals).lower()
+
+
+def reset_ingredients_data() -> None:
+    """Сбрасывает поисковые индексы и кэш ингредиентов.
+
+    Вызывается при изменении ингредиентов: из сигналов модели и после
+    массовой загрузки, которая сигналы не отправляет.
+    """
+    ingredients_index.invalidate()
+    ingredients_trigrams.invalidate()
+    bump_version("ingredients")
+
+
+def reset_tags_data() -> None:
+    """Сбрасывает кэш списка тэгов.
+
+    Вызывается при изменении тэгов: из сигналов модели и после
+    массовой загрузки, которая сигналы не отправляет.
+    """
+    bump_version("tags")
@@ -1,18 +1,104 @@
-from pathlib import Path
-
-from django.db.models.signals import post_delete
+from core.services import (
+    change_counter,
+    change_shopping_lists,
+    enqueue_image_release,
+    reset_ingredients_data,
+    reset_tags_data,
+)
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from recipes.models import Recipe
+from recipes.models import Carts, Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image(sender: Recipe, instance: Recipe, *a, **kw) -> None:
+    """Ставит картинку удалённого рецепта в очередь на освобождение.
+
+    Args:
+        sender (Recipe): Модель отправляющая сигнал.
+        instance (Recipe): Удалённый рецепт.
+    """
+    enqueue_image_release(instance.image.name)
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_image(sender: Recipe, instance: Recipe, *a, **kw) -> None:
+    """Ставит прежнюю картинку рецепта в очередь при её замене.
+
+    Args:
+        sender (Recipe): Модель отправляющая сигнал.
+        instance (Recipe): Сохранённый рецепт.
+    """
+    previous = instance._saved_image
+    if previous and previous != instance.image.name:
+        enqueue_image_release(previous)
+
+
+@receiver(post_save, sender=Recipe)
+def increase_recipes_count(
+    sender: Recipe, instance: Recipe, created: bool, *a, **kw
+) -> None:
+    """Увеличивает счётчик рецептов автора при создании рецепта.
+
+    Args:
+        sender (Recipe): Модель отправляющая сигнал.
+        instance (Recipe): Сохранённый рецепт.
+        created (bool): Рецепт создан, а не изменён.
+    """
+    if created:
+        change_counter(User, instance.author_id, "recipes_count", 1)
 
 
 @receiver(post_delete, sender=Recipe)
-def delete_image(sender: Recipe, instance: Recipe, *a, **kw) -> None:
-    """Удаляет картинку при удаление рецепта.
+def decrease_recipes_count(
+    sender: Recipe, instance: Recipe, *a, **kw
+) -> None:
+    """Уменьшает счётчик рецептов автора при удалении рецепта.
 
     Args:
         sender (Recipe): Модель отправляющая сигнал.
         instance (Recipe): Удалённый рецепт.
     """
-    image = Path(instance.image.path)
-    if image.exists():
-        image.unlink()
+    change_counter(User, instance.author_id, "recipes_count", -1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_from_shopping_lists(
+    sender: Recipe, instance: Recipe, *a, **kw
+) -> None:
+    """Вычитает ингредиенты удаляемого рецепта из списков покупок.
+
+    Args:
+        sender (Recipe): Модель отправляющая сигнал.
+        instance (Recipe): Удаляемый рецепт.
+    """
+    change_shopping_lists(
+        (instance.pk,),
+        Carts.objects.filter(recipe=instance).values_list("user", flat=True),
+        -1,
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def reset_ingredients_index(sender: Ingredient, *a, **kw) -> None:
+    """Сбрасывает поисковые индексы и кэш при изменении ингредиентов.
+
+    Args:
+        sender (Ingredient): Модель отправляющая сигнал.
+    """
+    reset_ingredients_data()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def reset_tags_cache(sender: Tag, *a, **kw) -> None:
+    """Сбрасывает кэш списка тэгов при изменении тэгов.
+
+    Args:
+        sender (Tag): Модель отправляющая сигнал.
+    """
+    reset_tags_data()
@@ -0,0 +1,43 @@
+"""Хранилище файлов, адресуемых по содержимому.
+
+Имя файла - SHA-256 загруженного содержимого, файлы раскладываются
+по подкаталогам из первых двух символов хэша:
+`recipe_images/ab/ab12...ef.jpg`. Одинаковые изображения хранятся
+один раз, повторная загрузка возвращает имя существующего файла.
+Поэтому файлы не удаляются вместе с рецептами: ссылка на файл может
+появиться в ещё не зафиксированной транзакции. Освобождённые файлы
+ставятся в очередь (см. `core.services.enqueue_image_release`), а
+удаляет их команда `collect_media_garbage`, которая пропускает недавно
+изменённые файлы; её следует запускать периодически.
+"""
+import os
+import posixpath
+from hashlib import sha256
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище с именами по хэшу содержимого."""
+
+    def _save(self, name: str, content: File) -> str:
+        digest = sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        directory, filename = posixpath.split(name)
+        _, extension = posixpath.splitext(filename)
+        hexdigest = digest.hexdigest()
+        name = posixpath.join(
+            directory, hexdigest[:2], f"{hexdigest}{extension.lower()}"
+        )
+        if self.exists(name):
+            # Файл снова используется, сборщик медиафайлов
+            # не удаляет недавно изменённые файлы
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
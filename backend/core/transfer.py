@@ -0,0 +1,377 @@
+"""Перенос рецептов между окружениями в формате NDJSON.
+
+Каждая строка - JSON-объект рецепта. Связанные объекты указываются
+естественными ключами, а не `id`, поэтому выгрузку можно загрузить
+в другую базу:
+
+    {"name": "Омлет", "author": "chef", "pub_date": "2023-01-01T10:00:00",
+     "image": "recipe_images/ab/ab12...ef.jpg", "text": "...",
+     "cooking_time": 10, "tags": ["breakfast"],
+     "ingredients": [{"name": "яйцо", "measurement_unit": "шт",
+                      "amount": 2}]}
+
+Файлы изображений в выгрузку не входят и переносятся вместе с каталогом
+медиафайлов до загрузки. Авторы, тэги, ингредиенты и файлы изображений
+должны существовать там, куда загружаются рецепты.
+"""
+import json
+import posixpath
+from collections import Counter, defaultdict
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, NamedTuple
+
+from core.enums import Limits
+from core.services import change_counter
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
+from django.db.transaction import atomic
+from django.utils.dateparse import parse_datetime
+from recipes.models import AmountIngredient, Ingredient, Recipe, Tag, Timeline
+
+if TYPE_CHECKING:
+    from users.models import MyUser
+
+
+class ImportResult(NamedTuple):
+    created: int
+    skipped: int
+    errors: list[str]
+
+
+def recipe_record(recipe: Recipe) -> dict:
+    """Запись рецепта для выгрузки.
+
+    Args:
+        recipe (Recipe): Рецепт с подгруженными автором, тэгами
+            и ингредиентами.
+
+    Returns:
+        dict: Данные рецепта.
+    """
+    return {
+        "name": recipe.name,
+        "author": recipe.author.username if recipe.author else None,
+        "pub_date": recipe.pub_date.isoformat(),
+        "image": recipe.image.name,
+        "text": recipe.text,
+        "cooking_time": recipe.cooking_time,
+        "tags": [tag.slug for tag in recipe.tags.all()],
+        "ingredients": [
+            {
+                "name": link.ingredients.name,
+                "measurement_unit": link.ingredients.measurement_unit,
+                "amount": link.amount,
+            }
+            for link in recipe.ingredient.all()
+        ],
+    }
+
+
+def export_recipes() -> Iterator[bytes]:
+    """Выгружает все рецепты построчно в формате NDJSON.
+
+    Рецепты читаются курсором частями по
+    `Limits.RECIPES_EXPORT_CHUNK_SIZE` (в PostgreSQL - серверным
+    курсором), тэги и ингредиенты каждой части подгружаются двумя
+    запросами. В памяти находится не больше одной части рецептов.
+
+    Yields:
+        bytes: Строка с рецептом, включая перевод строки.
+    """
+    recipes = (
+        Recipe.objects.select_related("author")
+        .prefetch_related(
+            "tags",
+            Prefetch(
+                "ingredient",
+                queryset=AmountIngredient.objects.select_related(
+                    "ingredients"
+                ),
+            ),
+        )
+        .order_by("pk")
+        .iterator(chunk_size=Limits.RECIPES_EXPORT_CHUNK_SIZE)
+    )
+    for recipe in recipes:
+        line = json.dumps(recipe_record(recipe), ensure_ascii=False)
+        yield f"{line}\n".encode()
+
+
+def _is_record(record: Any) -> bool:
+    """Проверяет типы полей записи, по которым ищутся связанные объекты."""
+    return (
+        isinstance(record, dict)
+        and isinstance(record.get("name"), str)
+        and isinstance(record.get("author"), str | None)
+        and isinstance(record.get("image"), str)
+        and isinstance(record.get("text"), str)
+        and isinstance(record.get("tags"), list)
+        and all(isinstance(slug, str) for slug in record["tags"])
+        and isinstance(record.get("ingredients"), list)
+        and all(
+            isinstance(item, dict) and isinstance(item.get("name"), str)
+            for item in record["ingredients"]
+        )
+    )
+
+
+def _parse_lines(
+    lines: Iterable[bytes | str],
+) -> Iterator[tuple[int, dict | None]]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if _is_record(record) else None
+
+
+def _build_recipe(
+    record: dict,
+    authors: dict[str, "MyUser"],
+    tags: dict[str, Tag],
+    ingredients: dict[tuple[str, str], Ingredient],
+) -> tuple[Recipe, list[Tag], dict[Ingredient, int]]:
+    """Создаёт несохранённый рецепт и его связи из записи выгрузки.
+
+    Значения проверяются валидаторами полей моделей, как при сохранении
+    через API, поэтому неправильная запись не прерывает загрузку
+    ошибкой базы данных.
+
+    Raises:
+        LookupError: Автор, тэг, ингредиент или изображение не найдены.
+        ValueError: Неправильная дата публикации.
+        ValidationError: Значение не прошло проверку поля модели.
+    """
+    author = authors.get(record["author"])
+    if record["author"] is not None and author is None:
+        raise LookupError(f"автор {record['author']} не найден")
+
+    recipe_tags = []
+    for slug in record["tags"]:
+        if slug not in tags:
+            raise LookupError(f"тэг {slug} не найден")
+        recipe_tags.append(tags[slug])
+
+    amounts = {}
+    for item in record["ingredients"]:
+        key = (item["name"], item["measurement_unit"])
+        if key not in ingredients:
+            raise LookupError(f"ингредиент {key[0]}, {key[1]} не найден")
+        amount = AmountIngredient(
+            ingredients=ingredients[key], amount=item["amount"]
+        )
+        amount.clean_fields(exclude=("recipe", "ingredients"))
+        amounts[amount.ingredients] = amount.amount
+
+    recipe = Recipe(
+        name=record["name"],
+        author=author,
+        pub_date=parse_datetime(record["pub_date"]),
+        image=record["image"],
+        text=record["text"],
+        cooking_time=record["cooking_time"],
+    )
+    if recipe.pub_date is None:
+        raise ValueError("неправильная дата публикации")
+    # Связанные объекты уже найдены, изображение проверяется отдельно
+    recipe.clean_fields(exclude=("author", "image"))
+    _check_image(record["image"])
+    return recipe, recipe_tags, amounts
+
+
+def _check_image(name: str) -> None:
+    """Проверяет, что файл изображения есть в хранилище рецептов.
+
+    Raises:
+        LookupError: Файл не найден или находится вне каталога
+            изображений рецептов.
+    """
+    upload_to = Recipe.image.field.upload_to
+    if (
+        posixpath.normpath(name) != name
+        or not name.startswith(upload_to)
+        or not Recipe.image.field.storage.exists(name)
+    ):
+        raise LookupError(f"изображение {name} не найдено")
+
+
+def _error_message(error: ValidationError) -> str:
+    if not hasattr(error, "error_dict"):
+        return " ".join(error.messages)
+    return "; ".join(
+        f"{field}: {' '.join(messages)}"
+        for field, messages in error.message_dict.items()
+    )
+
+
+def _load_references(records: list[dict]) -> tuple[dict, dict, dict, set]:
+    """Читает авторов, тэги, ингредиенты и рецепты, упомянутые в записях.
+
+    Returns:
+        tuple[dict, dict, dict, set]: Авторы по `username`, тэги по `slug`,
+            ингредиенты по названию и единице измерения и пары
+            (название, `id` автора) существующих рецептов.
+    """
+    authors = get_user_model().objects.in_bulk(
+        {record["author"] for record in records} - {None},
+        field_name="username",
+    )
+    tags = Tag.objects.in_bulk(
+        {slug for record in records for slug in record["tags"]},
+        field_name="slug",
+    )
+    ingredients = {
+        (ingredient.name, ingredient.measurement_unit): ingredient
+        for ingredient in Ingredient.objects.filter(
+            name__in={
+                item["name"]
+                for record in records
+                for item in record["ingredients"]
+            }
+        )
+    }
+    existing = set(
+        Recipe.objects.filter(
+            name__in={record["name"] for record in records}
+        ).values_list("name", "author")
+    )
+    return authors, tags, ingredients, existing
+
+
+def _import_batch(
+    records: list[tuple[int, dict | None]],
+    report: Callable[[int, str], None],
+) -> int:
+    """Загружает часть рецептов в одной транзакции.
+
+    Авторы, тэги, ингредиенты и уже существующие рецепты для всей части
+    читаются четырьмя запросами, рецепты и их связи добавляются через
+    `bulk_create`. Рецепты, которые уже есть у автора, пропускаются
+    без сообщения об ошибке.
+
+    Returns:
+        int: Количество добавленных рецептов.
+    """
+    valid = []
+    for number, record in records:
+        if record is None:
+            report(number, "неправильная запись")
+        else:
+            valid.append((number, record))
+    *references, existing = _load_references([record for _, record in valid])
+
+    recipes = []
+    for number, record in valid:
+        try:
+            recipe, *relations = _build_recipe(record, *references)
+        except KeyError as error:
+            report(number, f"не указано поле {error}")
+            continue
+        except ValidationError as error:
+            report(number, _error_message(error))
+            continue
+        except (LookupError, TypeError, ValueError) as error:
+            report(number, str(error) or "неправильные данные")
+            continue
+
+        key = (recipe.name, recipe.author_id)
+        if key not in existing:
+            existing.add(key)
+            recipes.append((recipe, *relations))
+
+    if recipes:
+        _save_recipes(recipes)
+    return len(recipes)
+
+
+@atomic
+def _save_recipes(
+    recipes: list[tuple[Recipe, list[Tag], dict[Ingredient, int]]],
+) -> None:
+    """Сохраняет рецепты и их связи несколькими запросами."""
+    User = get_user_model()
+    objs = [recipe for recipe, _, _ in recipes]
+    pub_dates = [recipe.pub_date for recipe in objs]
+    Recipe.objects.bulk_create(objs)
+    # `auto_now_add` заменяет дату при добавлении, исходная дата
+    # публикации записывается отдельным запросом
+    for recipe, pub_date in zip(objs, pub_dates):
+        recipe.pub_date = pub_date
+    Recipe.objects.bulk_update(objs, ("pub_date",))
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+        for recipe, recipe_tags, _ in recipes
+        for tag in set(recipe_tags)
+    )
+    AmountIngredient.objects.bulk_create(
+        AmountIngredient(recipe=recipe, ingredients=ingredient, amount=n)
+        for recipe, _, amounts in recipes
+        for ingredient, n in amounts.items()
+    )
+    _fan_out_recipes(objs)
+    for author_id, count in Counter(
+        recipe.author_id for recipe in objs
+    ).items():
+        change_counter(User, author_id, "recipes_count", count)
+
+
+def _fan_out_recipes(recipes: list[Recipe]) -> None:
+    """Добавляет загруженные рецепты в ленты подписчиков авторов."""
+    Subscriptions = apps.get_model("users", "Subscriptions")
+    followers = defaultdict(list)
+    for author_id, user_id in Subscriptions.objects.filter(
+        author__in={recipe.author_id for recipe in recipes}
+    ).values_list("author", "user"):
+        followers[author_id].append(user_id)
+
+    Timeline.objects.bulk_create(
+        (
+            Timeline(
+                user_id=user_id,
+                recipe_id=recipe.pk,
+                author_id=recipe.author_id,
+                pub_date=recipe.pub_date,
+            )
+            for recipe in recipes
+            for user_id in followers[recipe.author_id]
+        ),
+        batch_size=Limits.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def import_recipes(lines: Iterable[bytes | str]) -> ImportResult:
+    """Загружает рецепты из строк NDJSON.
+
+    Строки читаются по мере загрузки, каждые
+    `Limits.RECIPES_IMPORT_BATCH_SIZE` рецептов сохраняются в отдельной
+    транзакции. Неправильные строки и рецепты с неизвестными авторами,
+    тэгами или ингредиентами пропускаются, сообщения о первых
+    `Limits.RECIPES_IMPORT_MAX_ERRORS` из них возвращаются в результате.
+    Изображения не обрабатываются, варианты изображений переносятся
+    вместе с медиафайлами или строятся командой `make_image_variants`.
+
+    Args:
+        lines (Iterable[bytes | str]): Строки выгрузки.
+
+    Returns:
+        ImportResult: Количество добавленных и пропущенных рецептов
+            и сообщения об ошибках.
+    """
+    errors = []
+    created = read = 0
+
+    def report(number: int, message: str) -> None:
+        if len(errors) < Limits.RECIPES_IMPORT_MAX_ERRORS:
+            errors.append(f"Строка {number}: {message.rstrip('.')}.")
+
+    records = _parse_lines(lines)
+    while batch := list(islice(records, Limits.RECIPES_IMPORT_BATCH_SIZE)):
+        read += len(batch)
+        created += _import_batch(batch, report)
+    return ImportResult(created, read - created, errors)
@@ -0,0 +1,62 @@
+"""Приведение единиц измерения ингредиентов к базовым.
+
+Таблица `UNIT_CONVERSIONS` сопоставляет единице измерения базовую
+единицу и множитель. Пересчёт выполняется выражениями ORM, то есть
+внутри SQL-запроса, поэтому количества в разных единицах можно сразу
+суммировать в агрегации. Выражения принимают путь к полям, поэтому
+подходят для любой модели, связанной с ингредиентом.
+
+Example:
+    AmountIngredient.objects.annotate(
+        unit=base_unit("ingredients__measurement_unit"),
+        total=base_amount("amount", "ingredients__measurement_unit"),
+    )
+"""
+from django.db.models import CharField, F, IntegerField, Value
+from django.db.models.expressions import Case, CombinedExpression, When
+
+# Единица измерения: (базовая единица, количество базовых в одной)
+UNIT_CONVERSIONS: dict[str, tuple[str, int]] = {
+    "кг": ("г", 1000),
+    "л": ("мл", 1000),
+}
+
+
+def base_unit(unit_field: str) -> Case:
+    """Базовая единица измерения для значения поля `unit_field`.
+
+    Args:
+        unit_field (str): Путь к полю с единицей измерения.
+
+    Returns:
+        Case: Выражение с базовой единицей измерения.
+    """
+    return Case(
+        *(
+            When(**{unit_field: unit}, then=Value(base))
+            for unit, (base, _) in UNIT_CONVERSIONS.items()
+        ),
+        default=F(unit_field),
+        output_field=CharField(),
+    )
+
+
+def base_amount(amount_field: str, unit_field: str) -> CombinedExpression:
+    """Количество, пересчитанное в базовую единицу измерения.
+
+    Args:
+        amount_field (str): Путь к полю с количеством.
+        unit_field (str): Путь к полю с единицей измерения.
+
+    Returns:
+        CombinedExpression: Выражение с количеством в базовых единицах.
+    """
+    factor = Case(
+        *(
+            When(**{unit_field: unit}, then=Value(factor))
+            for unit, (_, factor) in UNIT_CONVERSIONS.items()
+        ),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    return F(amount_field) * factor
@@ -2,8 +2,9 @@
 """
 from re import compile
 from string import hexdigits
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable
 
+from core.caching import get_cached_objects
 from django.core.exceptions import ValidationError
 from django.utils.deconstruct import deconstructible
 
@@ -132,25 +133,62 @@ def hex_color_validator(color: str) -> str:
     return "#" + color.upper()
 
 
+def _to_id(value: int | str, field: str) -> int:
+    if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+        return int(value)
+    raise ValidationError(f"Неправильный id {field}: {value}")
+
+
+def _get_existing(
+    ids: Iterable[int], table: str, Model: "Tag | Ingredient", field: str
+) -> dict[int, "Tag | Ingredient"]:
+    """Находит объекты с указанными id в кэше справочника.
+
+    Запрос к базе выполняется только при устаревшем кэше или если
+    какого-то id нет в кэше: объект мог быть создан в другом процессе.
+    В этом случае запрашиваются только недостающие id, общий кэш
+    не перестраивается, поэтому несуществующие id не вызывают загрузку
+    всего справочника.
+
+    Raises:
+        ValidationError: Объектов с некоторыми id не существует.
+    """
+    ids = set(ids)
+    cached = get_cached_objects(table, Model.objects.in_bulk)
+    objects = {pk: cached[pk] for pk in ids if pk in cached}
+    if len(objects) < len(ids):
+        objects.update(Model.objects.in_bulk(ids - objects.keys()))
+
+    missing = sorted(ids - objects.keys())
+    if missing:
+        raise ValidationError(
+            f"Не существует {field} с id: {', '.join(map(str, missing))}"
+        )
+    return objects
+
+
 def tags_exist_validator(tags_ids: list[int | str], Tag: "Tag") -> list["Tag"]:
     """Проверяет наличие тэгов с указанными id.
 
+    Тэги берутся из кэша справочника, поэтому обычно проверка не требует
+    запроса к базе.
+
     Args:
         tags_ids (list[int | str]): Список id.
         Tag (Tag): Модель тэгов во избежании цикличного импорта.
 
     Raises:
-        ValidationError: Тэга с одним из указанных id не существует.
+        ValidationError: Тэгов с некоторыми из указанных id не существует.
+
+    Returns:
+        list[Tag]: Тэги с указанными id.
     """
     if not tags_ids:
         raise ValidationError("Не указаны тэги")
 
-    tags = Tag.objects.filter(id__in=tags_ids)
-
-    if len(tags) != len(tags_ids):
-        raise ValidationError("Указан несуществующий тэг")
-
-    return tags
+    ids = {_to_id(tag_id, "тэга") for tag_id in tags_ids}
+    tags = _get_existing(ids, "tags", Tag, "тэгов")
+    return [tags[tag_id] for tag_id in ids]
 
 
 def ingredients_validator(
@@ -161,6 +199,9 @@ def ingredients_validator(
 
     Если повторяется ингридиенты, то сохраняется последний, считаем,
     что пользователь забыл, что уже указывал ингридиент и написал его опять.
+    Ингредиенты берутся из кэша справочника, поэтому обычно проверка
+    не требует запроса к базе, а найденные объекты используются
+    при сохранении рецепта.
 
     Args:
         ingredients (list[dict[str, str | int]]):
@@ -174,6 +215,7 @@ def ingredients_validator(
 
     Returns:
         dict[int, tuple[Ingredient, int]]:
+            Ингредиенты и их количество по id ингредиента.
     """
     if not ingredients:
         raise ValidationError("Не указаны ингридиенты")
@@ -181,21 +223,16 @@ def ingredients_validator(
     valid_ings = {}
 
     for ing in ingredients:
+        if not isinstance(ing, dict) or "id" not in ing or "amount" not in ing:
+            raise ValidationError("Неправильные ингидиенты")
         if not (isinstance(ing["amount"], int) or ing["amount"].isdigit()):
             raise ValidationError("Неправильное количество ингидиента")
 
-        valid_ings[ing["id"]] = int(ing["amount"])
-        if valid_ings[ing["id"]] <= 0:
+        valid_ings[_to_id(ing["id"], "ингредиента")] = int(ing["amount"])
+        if int(ing["amount"]) <= 0:
             raise ValidationError("Неправильное количество ингридиента")
 
-    if not valid_ings:
-        raise ValidationError("Неправильные ингидиенты")
-
-    db_ings = Ingredient.objects.filter(pk__in=valid_ings.keys())
-    if not db_ings:
-        raise ValidationError("Неправильные ингидиенты")
-
-    for ing in db_ings:
-        valid_ings[ing.pk] = (ing, valid_ings[ing.pk])
-
-    return valid_ings
+    db_ings = _get_existing(
+        valid_ings.keys(), "ingredients", Ingredient, "ингредиентов"
+    )
+    return {pk: (db_ings[pk], amount) for pk, amount in valid_ings.items()}
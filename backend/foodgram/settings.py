@@ -4,6 +4,16 @@ from decouple import Csv, config
 
 DATE_TIME_FORMAT = "%d/%m/%Y %H:%M"
 
+# Шрифт с кириллицей для выгрузки списка покупок в PDF
+PDF_FONT_PATH = config(
+    "PDF_FONT_PATH",
+    default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+# Количество процессов для обработки изображений рецептов,
+# 0 - обработка в процессе приложения после сохранения рецепта
+IMAGE_WORKERS = config("IMAGE_WORKERS", default=2, cast=int)
+
 DEBUG = config("DEBUG", default=False, cast=bool)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -29,6 +39,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "djoser",
@@ -84,7 +84,7 @@ class RecipeAdmin(ModelAdmin):
     get_image.short_description = "Изображение"
 
     def count_favorites(self, obj: Recipe) -> int:
-        return obj.in_favorites.count()
+        return obj.favorites_count
 
     count_favorites.short_description = "В избранном"
 
@@ -0,0 +1,85 @@
+from random import Random
+from statistics import mean, quantiles
+from time import perf_counter
+
+from core.search import fuzzy_search_ingredients, ingredients_index
+from django.core.management.base import BaseCommand
+from recipes.models import Ingredient
+
+LETTERS = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+
+
+def make_typo(word: str, rnd: Random) -> str:
+    """Вносит в слово одну случайную опечатку.
+
+    Args:
+        word (str): Исходное слово.
+        rnd (Random): Генератор случайных чисел.
+
+    Returns:
+        str: Слово с заменой, пропуском или перестановкой символа.
+    """
+    idx = rnd.randrange(len(word))
+    kind = rnd.randrange(3)
+    if kind == 0:
+        return word[:idx] + rnd.choice(LETTERS) + word[idx + 1:]
+    if kind == 1 and len(word) > 3:
+        return word[:idx] + word[idx + 1:]
+    if idx < len(word) - 1:
+        return word[:idx] + word[idx + 1] + word[idx] + word[idx + 2:]
+    return word
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время поиска ингредиентов по названиям с опечатками "
+        "(нечёткий поиск) и по префиксу."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--queries", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def measure(self, search, queries: list[str]) -> tuple[list, list]:
+        timings, results = [], []
+        for query in queries:
+            start = perf_counter()
+            results.append(search(query))
+            timings.append((perf_counter() - start) * 1000)
+        return timings, results
+
+    def report(self, title: str, timings: list[float]) -> None:
+        cuts = quantiles(timings, n=100)
+        self.stdout.write(
+            f"{title}: запросов {len(timings)}, "
+            f"среднее {mean(timings):.3f} мс, "
+            f"p50 {cuts[49]:.3f} мс, p95 {cuts[94]:.3f} мс"
+        )
+
+    def handle(self, *args, **options) -> None:
+        names = list(Ingredient.objects.values_list("name", flat=True))
+        if not names:
+            self.stderr.write("В базе нет ингредиентов.")
+            return
+
+        rnd = Random(options["seed"])
+        originals = [rnd.choice(names) for _ in range(options["queries"])]
+        typos = [make_typo(name, rnd) for name in originals]
+
+        # Первый вызов строит индексы в памяти, в замер он не входит.
+        fuzzy_search_ingredients(typos[0])
+        ingredients_index.search(originals[0][:3])
+
+        timings, results = self.measure(fuzzy_search_ingredients, typos)
+        hits = sum(
+            original in (ing.name for ing in found)
+            for original, found in zip(originals, results)
+        )
+        self.report("Нечёткий поиск", timings)
+        self.stdout.write(
+            f"Найдено исходное название: {hits / len(typos):.1%}"
+        )
+
+        prefixes = [name[:3] for name in originals]
+        timings, _ = self.measure(ingredients_index.search, prefixes)
+        self.report("Поиск по префиксу", timings)
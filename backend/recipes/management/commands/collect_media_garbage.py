@@ -0,0 +1,194 @@
+import glob
+import os
+import posixpath
+import time
+from itertools import chain
+from pathlib import Path
+from typing import Iterator
+
+from core.enums import Limits
+from core.images import image_stem, variant_names
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import Q
+from recipes.models import Recipe, ReleasedImage
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет файлы изображений рецептов, на которые не ссылается "
+        "ни один рецепт. Сначала обрабатывается очередь файлов, "
+        "освобождённых при удалении рецептов и замене изображений, затем "
+        "каталог изображений проверяется целиком: находятся исходные "
+        "файлы, их варианты и временные файлы прерванных сохранений."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать файлы без ссылок, ничего не удалять.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=Limits.MEDIA_GC_BATCH_SIZE,
+            help="Количество файлов, удаляемых за раз.",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=Limits.MEDIA_GC_MIN_AGE,
+            help=(
+                "Минимальный возраст файла в секундах. Более новые файлы "
+                "могут принадлежать незавершённым транзакциям."
+            ),
+        )
+        parser.add_argument(
+            "--queue-only",
+            action="store_true",
+            help="Обработать только очередь, не обходя каталог изображений.",
+        )
+
+    def _referenced_stems(self) -> set[str]:
+        images = (
+            Recipe.objects.exclude(image="")
+            .values_list("image", flat=True)
+            .iterator(chunk_size=Limits.MEDIA_GC_BATCH_SIZE)
+        )
+        return {image_stem(name) for name in images}
+
+    def _is_fresh(self, path: Path, stem: str, deadline: float) -> bool:
+        # Хранилище обновляет время изменения исходного файла при повторной
+        # загрузке, варианты изображения живут столько же, сколько исходный
+        original = glob.escape(posixpath.basename(stem))
+        return any(
+            file.stat().st_mtime > deadline
+            for file in (path, *path.parent.glob(f"{original}.*"))
+            if file.exists()
+        )
+
+    def _orphans(
+        self, root: Path, referenced: set[str], deadline: float
+    ) -> Iterator[tuple[str, Path, int]]:
+        media_root = Path(Recipe.image.field.storage.location)
+        for directory, _, files in os.walk(root):
+            for filename in sorted(files):
+                path = Path(directory, filename)
+                stem = image_stem(path.relative_to(media_root).as_posix())
+                if stem in referenced or self._is_fresh(path, stem, deadline):
+                    continue
+                yield stem, path, path.stat().st_size
+
+    def _referenced_among(self, stems: set[str]) -> set[str]:
+        query = Q()
+        for stem in stems:
+            query |= Q(image__startswith=f"{stem}.")
+        return {
+            image_stem(name)
+            for name in Recipe.objects.filter(query).values_list(
+                "image", flat=True
+            )
+        }
+
+    def _release_queued(
+        self, deadline: float, batch_size: int, dry_run: bool
+    ) -> Iterator[tuple[Path, int]]:
+        # Файл из очереди удаляется вместе с вариантами, если на него
+        # не ссылается ни один рецепт. Недавно изменённые файлы остаются
+        # в очереди до следующего запуска: ссылка на них может появиться
+        # в незавершённой транзакции.
+        storage = Recipe.image.field.storage
+        last_pk = 0
+        while batch := list(
+            ReleasedImage.objects.filter(pk__gt=last_pk).values_list(
+                "pk", "name"
+            )[:batch_size]
+        ):
+            last_pk = batch[-1][0]
+            names = {name: image_stem(name) for _, name in batch}
+            referenced = self._referenced_among(set(names.values()))
+            done = set()
+            for name, stem in names.items():
+                path = Path(storage.path(name))
+                if stem in referenced:
+                    done.add(name)
+                    continue
+                if self._is_fresh(path, stem, deadline):
+                    continue
+                done.add(name)
+                for file_name in (name, *variant_names(name)):
+                    file = Path(storage.path(file_name))
+                    if file.exists():
+                        self._released.add(file)
+                        yield file, file.stat().st_size
+                        if not dry_run:
+                            file.unlink(missing_ok=True)
+            if not dry_run:
+                ReleasedImage.objects.filter(
+                    pk__lte=last_pk, name__in=done
+                ).delete()
+
+    def _delete(self, batch: list[tuple[str, Path]], deadline: float) -> None:
+        # Файл мог снова получить ссылку после построения списка,
+        # поэтому ссылки и время изменения проверяются ещё раз
+        # непосредственно перед удалением
+        referenced = self._referenced_among({stem for stem, _ in batch})
+        for stem, path in batch:
+            if stem not in referenced and not self._is_fresh(
+                path, stem, deadline
+            ):
+                path.unlink(missing_ok=True)
+
+    def _collect_orphans(
+        self, root: Path, deadline: float, batch_size: int, dry_run: bool
+    ) -> Iterator[tuple[Path, int]]:
+        referenced = self._referenced_stems()
+        batch = []
+        for stem, path, file_size in self._orphans(root, referenced, deadline):
+            if path in self._released:
+                continue
+            yield path, file_size
+            if dry_run:
+                continue
+            batch.append((stem, path))
+            if len(batch) >= batch_size:
+                self._delete(batch, deadline)
+                batch = []
+        if batch:
+            self._delete(batch, deadline)
+
+    def handle(self, *args, **options) -> None:
+        storage = Recipe.image.field.storage
+        root = Path(
+            storage.path(posixpath.dirname(Recipe.image.field.upload_to))
+        )
+        if not root.is_dir():
+            self.stdout.write("Каталог изображений не найден.")
+            return
+
+        deadline = time.time() - options["min_age"]
+        dry_run = options["dry_run"]
+        self._released = set()
+        files = self._release_queued(deadline, options["batch_size"], dry_run)
+        if not options["queue_only"]:
+            files = chain(
+                files,
+                self._collect_orphans(
+                    root, deadline, options["batch_size"], dry_run
+                ),
+            )
+
+        count = size = 0
+        for path, file_size in files:
+            count += 1
+            size += file_size
+            if dry_run or options["verbosity"] > 1:
+                self.stdout.write(str(path))
+
+        action = "Найдено" if dry_run else "Удалено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} файлов без ссылок: {count} "
+                f"({size / 1024 / 1024:.1f} МБ)."
+            )
+        )
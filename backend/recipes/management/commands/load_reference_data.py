@@ -0,0 +1,189 @@
+import csv
+import io
+import json
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator, TextIO
+
+from core.services import reset_ingredients_data, reset_tags_data
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.transaction import atomic
+from recipes.models import Ingredient, Tag
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(file: TextIO) -> Iterator[dict]:
+    """Читает элементы JSON-массива по одному, не загружая файл целиком.
+
+    Args:
+        file (TextIO): Файл с JSON-массивом объектов.
+
+    Yields:
+        dict: Очередной элемент массива.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Ожидается JSON-массив.")
+    buffer = buffer[1:]
+
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError("Файл JSON оборван.")
+            buffer += chunk
+            continue
+        yield obj
+        buffer = buffer[end:]
+
+
+def read_json(file: TextIO) -> Iterator[Tag | Ingredient]:
+    """Читает фикстуру Django с тэгами и ингредиентами.
+
+    Args:
+        file (TextIO): Файл в формате `dumpdata`.
+
+    Yields:
+        Tag | Ingredient: Несохранённые объекты.
+    """
+    models = {"recipes.tag": Tag, "recipes.ingredient": Ingredient}
+    for obj in iter_json_array(file):
+        model = models.get(obj.get("model"))
+        if model is not None:
+            yield model(pk=obj.get("pk"), **obj["fields"])
+
+
+def read_csv(file: TextIO) -> Iterator[Ingredient]:
+    """Читает ингредиенты из CSV со столбцами `name,measurement_unit`.
+
+    Args:
+        file (TextIO): Файл CSV, строка заголовка необязательна.
+
+    Yields:
+        Ingredient: Несохранённые объекты.
+    """
+    for row in csv.reader(file):
+        if len(row) < 2 or row[:2] == ["name", "measurement_unit"]:
+            continue
+        yield Ingredient(
+            name=row[0].strip().lower(),
+            measurement_unit=row[1].strip().lower(),
+        )
+
+
+def copy_ingredients(ingredients: list[Ingredient]) -> None:
+    """Загружает ингредиенты в PostgreSQL через COPY.
+
+    Строки копируются во временную таблицу и переносятся в основную
+    с `ON CONFLICT DO NOTHING`, повторы по `unique_for_ingredient`
+    пропускаются.
+
+    Args:
+        ingredients (list[Ingredient]): Пакет ингредиентов.
+    """
+    table = Ingredient._meta.db_table
+    data = io.StringIO()
+    writer = csv.writer(data)
+    for ing in ingredients:
+        writer.writerow((ing.pk or "", ing.name, ing.measurement_unit))
+    data.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS tmp_ingredient "
+            "(id bigint, name varchar(64), measurement_unit varchar(24)) "
+            "ON COMMIT DROP"
+        )
+        cursor.execute("TRUNCATE tmp_ingredient")
+        cursor.copy_expert(
+            "COPY tmp_ingredient (id, name, measurement_unit) "
+            "FROM STDIN WITH (FORMAT csv, NULL '')",
+            data,
+        )
+        cursor.execute(
+            f"INSERT INTO {table} (id, name, measurement_unit) "
+            "SELECT id, name, measurement_unit FROM tmp_ingredient "
+            "WHERE id IS NOT NULL ON CONFLICT DO NOTHING"
+        )
+        cursor.execute(
+            f"INSERT INTO {table} (name, measurement_unit) "
+            "SELECT name, measurement_unit FROM tmp_ingredient "
+            "WHERE id IS NULL ON CONFLICT DO NOTHING"
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Быстрая загрузка тэгов и ингредиентов из фикстуры JSON "
+        "или CSV-файла с ингредиентами. Существующие записи пропускаются."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "path",
+            nargs="?",
+            type=Path,
+            default=settings.BASE_DIR / "data" / "dump.json",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY даже на PostgreSQL.",
+        )
+
+    def save_batch(self, batch: list[Tag | Ingredient]) -> None:
+        tags = [obj for obj in batch if isinstance(obj, Tag)]
+        ingredients = [obj for obj in batch if isinstance(obj, Ingredient)]
+
+        if tags:
+            Tag.objects.bulk_create(tags, ignore_conflicts=True)
+        if ingredients and self.use_copy:
+            copy_ingredients(ingredients)
+        elif ingredients:
+            Ingredient.objects.bulk_create(ingredients, ignore_conflicts=True)
+
+    def handle(self, *args, **options) -> None:
+        path: Path = options["path"]
+        batch_size: int = options["batch_size"]
+        self.use_copy = (
+            connection.vendor == "postgresql" and not options["no_copy"]
+        )
+        reader = read_csv if path.suffix.lower() == ".csv" else read_json
+        before = Ingredient.objects.count() + Tag.objects.count()
+        start = perf_counter()
+        total = 0
+
+        with open(path, encoding="utf-8") as file, atomic():
+            objects = reader(file)
+            while batch := list(islice(objects, batch_size)):
+                self.save_batch(batch)
+                total += len(batch)
+
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), (Tag, Ingredient)
+                ):
+                    cursor.execute(sql)
+
+        elapsed = perf_counter() - start
+        added = Ingredient.objects.count() + Tag.objects.count() - before
+        reset_ingredients_data()
+        reset_tags_data()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано записей: {total}, добавлено: {added}, "
+                f"за {elapsed:.3f} с ({total / max(elapsed, 1e-9):.0f} в с)."
+            )
+        )
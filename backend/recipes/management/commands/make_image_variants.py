@@ -0,0 +1,24 @@
+from core.images import process_image
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит варианты изображений (размеры, WebP и JPEG) для всех "
+        "рецептов, например для изображений, загруженных ранее."
+    )
+
+    def handle(self, *args, **options) -> None:
+        images = (
+            Recipe.objects.exclude(image="")
+            .values_list("image", flat=True)
+            .iterator()
+        )
+        count = 0
+        for name in images:
+            process_image(Recipe.image.field.storage.path(name))
+            count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Обработано изображений: {count}.")
+        )
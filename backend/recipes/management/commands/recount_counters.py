@@ -0,0 +1,19 @@
+from core.services import recount_counters
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает хранимые счётчики: избранное у рецептов, "
+        "рецепты и подписчиков у пользователей, списки покупок."
+    )
+
+    def handle(self, *args, **options) -> None:
+        updated = recount_counters()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Счётчики пересчитаны. Рецептов: {updated['recipes']}, "
+                f"пользователей: {updated['users']}, "
+                f"строк списков покупок: {updated['shopping_lists']}."
+            )
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.7 on 2026-10-18 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="carts",
+            index=models.Index(
+                fields=["user", "recipe"], name="carts_user_recipe_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="favorites",
+            index=models.Index(
+                fields=["user", "recipe"], name="favorites_user_recipe_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-pub_date", "-id"], name="recipe_pub_date_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.1.7 on 2026-10-18 03:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_links(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Favorites = apps.get_model("recipes", "Favorites")
+    User = apps.get_model("users", "MyUser")
+    Subscriptions = apps.get_model("users", "Subscriptions")
+
+    Recipe.objects.update(favorites_count=count_links(Favorites, "recipe"))
+    User.objects.update(
+        recipes_count=count_links(Recipe, "author"),
+        followers_count=count_links(Subscriptions, "author"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0003_recipe_feed_indexes"),
+        ("users", "0002_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В избранном"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
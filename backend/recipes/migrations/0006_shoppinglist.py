@@ -0,0 +1,90 @@
+# Generated by Django 4.1.7 on 2026-10-18 03:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    AmountIngredient = apps.get_model("recipes", "AmountIngredient")
+    ShoppingList = apps.get_model("recipes", "ShoppingList")
+
+    totals = (
+        AmountIngredient.objects.filter(recipe__in_carts__isnull=False)
+        .values("recipe__in_carts__user", "ingredients")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+    ShoppingList.objects.bulk_create(
+        (
+            ShoppingList(
+                user_id=row["recipe__in_carts__user"],
+                ingredient_id=row["ingredients"],
+                amount=row["total"],
+            )
+            for row in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0005_ingredient_name_trgm"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingList",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество"
+                    ),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="in_shopping_lists",
+                        to="recipes.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shopping_list",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Владелец списка",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ингредиент в списке покупок",
+                "verbose_name_plural": "Списки покупок",
+                "ordering": ("user", "ingredient__name"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="shoppinglist",
+            constraint=models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="\nrecipes_shoppinglist ingredient in list alredy\n",
+            ),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
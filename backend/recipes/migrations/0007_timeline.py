@@ -0,0 +1,110 @@
+# Generated by Django 4.1.7 on 2026-10-18 03:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_timelines(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Timeline = apps.get_model("recipes", "Timeline")
+
+    rows = Recipe.objects.filter(
+        author__subscribers__isnull=False
+    ).values_list("author__subscribers__user", "id", "author", "pub_date")
+    Timeline.objects.bulk_create(
+        (
+            Timeline(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for user_id, recipe_id, author_id, pub_date in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("users", "0002_user_counters"),
+        ("recipes", "0006_shoppinglist"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Timeline",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "pub_date",
+                    models.DateTimeField(
+                        editable=False, verbose_name="Дата публикации"
+                    ),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор рецепта",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="in_timelines",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Владелец ленты",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Рецепт в ленте",
+                "verbose_name_plural": "Ленты подписок",
+                "ordering": ("user", "-pub_date", "-recipe"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="timeline",
+            index=models.Index(
+                fields=["user", "-pub_date", "-recipe"],
+                name="timeline_user_pub_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timeline",
+            index=models.Index(
+                fields=["user", "author"], name="timeline_user_author_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="timeline",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"),
+                name="\nrecipes_timeline recipe in timeline alredy\n",
+            ),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.7 on 2026-10-18 04:03
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0007_timeline"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                storage=core.storage.ContentAddressedStorage(),
+                upload_to="recipe_images/",
+                verbose_name="Изображение блюда",
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.7 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0008_recipe_image_storage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReleasedImage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=100, verbose_name="Имя файла"),
+                ),
+                (
+                    "released_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Время освобождения"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Освобождённое изображение",
+                "verbose_name_plural": "Освобождённые изображения",
+                "ordering": ("pk",),
+            },
+        ),
+    ]
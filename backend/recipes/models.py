@@ -16,8 +16,16 @@ Models:
         Указывает избранные пользователем рецепты.
     Cart:
         Рецепты в корзине покупок пользователя.
+    ShoppingList:
+        Суммарное количество ингредиентов в корзине покупок пользователя.
+    Timeline:
+        Лента рецептов авторов, на которых подписан пользователь.
+    ReleasedImage:
+        Очередь файлов изображений, освобождённых рецептами.
 """
-from core.enums import Limits, Tuples
+from core.enums import Limits
+from core.images import schedule_image_processing
+from core.storage import ContentAddressedStorage
 from core.validators import OneOfTwoValidator, hex_color_validator
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
@@ -29,15 +37,16 @@ from django.db.models import (
     DateTimeField,
     ForeignKey,
     ImageField,
+    Index,
     ManyToManyField,
     Model,
+    PositiveIntegerField,
     PositiveSmallIntegerField,
     Q,
     TextField,
     UniqueConstraint,
 )
 from django.db.models.functions import Length
-from PIL import Image
 
 CharField.register_lookup(Length)
 
@@ -179,6 +188,9 @@ class Recipe(Model):
         cooking_time(int):
             Время приготовления рецепта.
             Установлены ограничения по максимальным и минимальным значениям.
+        favorites_count(int):
+            Сколько раз рецепт добавлен в `избранное`. Хранимый счётчик,
+            изменяется вместе со связями Favorites.
     """
 
     name = CharField(
@@ -211,6 +223,7 @@ class Recipe(Model):
     image = ImageField(
         verbose_name="Изображение блюда",
         upload_to="recipe_images/",
+        storage=ContentAddressedStorage(),
     )
     text = TextField(
         verbose_name="Описание блюда",
@@ -230,11 +243,24 @@ class Recipe(Model):
             ),
         ),
     )
+    favorites_count = PositiveIntegerField(
+        verbose_name="В избранном",
+        default=0,
+        editable=False,
+    )
+
+    _saved_image: str | None = None
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
+        indexes = (
+            Index(
+                fields=("-pub_date", "-id"),
+                name="recipe_pub_date_id_idx",
+            ),
+        )
         constraints = (
             UniqueConstraint(
                 fields=("name", "author"),
@@ -253,11 +279,25 @@ class Recipe(Model):
         self.name = self.name.capitalize()
         return super().clean()
 
+    @classmethod
+    def from_db(cls, db: str, field_names: list, values: list) -> "Recipe":
+        recipe = super().from_db(db, field_names, values)
+        image = recipe.__dict__.get("image")
+        recipe._saved_image = None if image is None else str(image)
+        return recipe
+
     def save(self, *args, **kwargs) -> None:
+        """Сохраняет рецепт.
+
+        Если изображение заменено, построение его вариантов ставится
+        в очередь (см. `core.images`). Сохранения без изменения изображения
+        файл не затрагивают.
+        """
+        image_changed = self.image.name != self._saved_image
         super().save(*args, **kwargs)
-        image = Image.open(self.image.path)
-        image.thumbnail(Tuples.RECIPE_IMAGE_SIZE)
-        image.save(self.image.path)
+        self._saved_image = self.image.name
+        if image_changed and self.image:
+            schedule_image_processing(self.image.path)
 
 
 class AmountIngredient(Model):
@@ -353,6 +393,12 @@ class Favorites(Model):
     class Meta:
         verbose_name = "Избранный рецепт"
         verbose_name_plural = "Избранные рецепты"
+        indexes = (
+            Index(
+                fields=("user", "recipe"),
+                name="favorites_user_recipe_idx",
+            ),
+        )
         constraints = (
             UniqueConstraint(
                 fields=(
@@ -400,6 +446,12 @@ class Carts(Model):
     class Meta:
         verbose_name = "Рецепт в списке покупок"
         verbose_name_plural = "Рецепты в списке покупок"
+        indexes = (
+            Index(
+                fields=("user", "recipe"),
+                name="carts_user_recipe_idx",
+            ),
+        )
         constraints = (
             UniqueConstraint(
                 fields=(
@@ -412,3 +464,158 @@ class Carts(Model):
 
     def __str__(self) -> str:
         return f"{self.user} -> {self.recipe}"
+
+
+class ShoppingList(Model):
+    """Список покупок пользователя.
+
+    Хранит сумму количества каждого ингредиента по всем рецептам
+    в корзине пользователя. Обновляется вместе с корзиной
+    (см. `core.services.change_shopping_lists`).
+
+    Attributes:
+        user(int):
+            Владелец списка. Связь через ForeignKey.
+        ingredient(int):
+            Ингредиент. Связь через ForeignKey.
+        amount(int):
+            Суммарное количество ингредиента.
+    """
+
+    user = ForeignKey(
+        verbose_name="Владелец списка",
+        related_name="shopping_list",
+        to=User,
+        on_delete=CASCADE,
+    )
+    ingredient = ForeignKey(
+        verbose_name="Ингредиент",
+        related_name="in_shopping_lists",
+        to=Ingredient,
+        on_delete=CASCADE,
+    )
+    amount = PositiveIntegerField(
+        verbose_name="Количество",
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Списки покупок"
+        ordering = ("user", "ingredient__name")
+        constraints = (
+            UniqueConstraint(
+                fields=(
+                    "user",
+                    "ingredient",
+                ),
+                name="\n%(app_label)s_%(class)s ingredient in list alredy\n",
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f"{self.user} -> {self.amount} {self.ingredient}"
+
+
+class Timeline(Model):
+    """Лента рецептов авторов, на которых подписан пользователь.
+
+    Строки добавляются при публикации рецепта всем подписчикам автора,
+    при подписке - из последних рецептов автора, и удаляются при отписке
+    (см. `core.services.fan_out_recipe`). Дата публикации хранится
+    в строке ленты, поэтому страница ленты читается по одному индексу.
+
+    Attributes:
+        user(int):
+            Владелец ленты. Связь через ForeignKey.
+        recipe(int):
+            Рецепт в ленте. Связь через ForeignKey.
+        author(int):
+            Автор рецепта. Связь через ForeignKey.
+        pub_date(datetime):
+            Дата публикации рецепта.
+    """
+
+    user = ForeignKey(
+        verbose_name="Владелец ленты",
+        related_name="timeline",
+        to=User,
+        on_delete=CASCADE,
+    )
+    recipe = ForeignKey(
+        verbose_name="Рецепт",
+        related_name="in_timelines",
+        to=Recipe,
+        on_delete=CASCADE,
+    )
+    author = ForeignKey(
+        verbose_name="Автор рецепта",
+        related_name="+",
+        to=User,
+        on_delete=CASCADE,
+    )
+    pub_date = DateTimeField(
+        verbose_name="Дата публикации",
+        editable=False,
+    )
+
+    class Meta:
+        verbose_name = "Рецепт в ленте"
+        verbose_name_plural = "Ленты подписок"
+        ordering = ("user", "-pub_date", "-recipe")
+        constraints = (
+            UniqueConstraint(
+                fields=(
+                    "user",
+                    "recipe",
+                ),
+                name="\n%(app_label)s_%(class)s recipe in timeline alredy\n",
+            ),
+        )
+        indexes = (
+            Index(
+                fields=("user", "-pub_date", "-recipe"),
+                name="timeline_user_pub_date_idx",
+            ),
+            Index(
+                fields=("user", "author"),
+                name="timeline_user_author_idx",
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f"{self.user} -> {self.recipe}"
+
+
+class ReleasedImage(Model):
+    """Файл изображения, на который перестал ссылаться рецепт.
+
+    Строка добавляется в транзакции удаления рецепта или замены его
+    изображения (см. `core.signals`), сам файл не затрагивается.
+    Команда `collect_media_garbage` сначала проверяет файлы из очереди
+    и удаляет те, на которые больше не ссылается ни один рецепт.
+
+    Attributes:
+        name(str):
+            Имя файла в хранилище изображений.
+        released_at(datetime):
+            Время освобождения файла.
+    """
+
+    name = CharField(
+        verbose_name="Имя файла",
+        max_length=Recipe.image.field.max_length,
+    )
+    released_at = DateTimeField(
+        verbose_name="Время освобождения",
+        auto_now_add=True,
+        editable=False,
+    )
+
+    class Meta:
+        verbose_name = "Освобождённое изображение"
+        verbose_name_plural = "Освобождённые изображения"
+        ordering = ("pk",)
+
+    def __str__(self) -> str:
+        return self.name
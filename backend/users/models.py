@@ -20,6 +20,7 @@ from django.db.models import (
     F,
     ForeignKey,
     Model,
+    PositiveIntegerField,
     Q,
     UniqueConstraint,
 )
@@ -57,6 +58,10 @@ class MyUser(AbstractUser):
             Установлено ограничение по максимальной длине.
         is_active (bool):
             Активен или заблокирован пользователь.
+        recipes_count (int):
+            Количество рецептов пользователя. Хранимый счётчик.
+        followers_count (int):
+            Количество подписчиков пользователя. Хранимый счётчик.
     """
 
     email = EmailField(
@@ -111,6 +116,16 @@ class MyUser(AbstractUser):
         verbose_name="Активирован",
         default=True,
     )
+    recipes_count = PositiveIntegerField(
+        verbose_name="Количество рецептов",
+        default=0,
+        editable=False,
+    )
+    followers_count = PositiveIntegerField(
+        verbose_name="Количество подписчиков",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = "Пользователь"
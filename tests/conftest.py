@@ -0,0 +1,41 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture(scope="session")
+def django_db():
+    """Настраивает Django и создаёт тестовую базу SQLite в памяти."""
+    os.environ["DJANGO_SETTINGS_MODULE"] = "foodgram.settings"
+    os.environ["DB_ENGINE"] = "django.db.backends.sqlite3"
+    os.environ["DB_NAME"] = ":memory:"
+
+    import django
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    django.setup()
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    yield
+    teardown_databases(old_config, verbosity=0)
+    teardown_test_environment()
+
+
+@pytest.fixture
+def db(django_db):
+    """Выполняет тест в транзакции, которая откатывается по завершении."""
+    from django.db import transaction
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
@@ -0,0 +1,29 @@
+import pytest
+from core.caching import bump_version, get_cached_content
+
+
+@pytest.mark.caching
+def test_content_is_rebuilt_after_version_bump():
+    built = []
+
+    def build():
+        built.append(1)
+        return f'[{len(built)}]'.encode()
+
+    first = get_cached_content('test_table', build)
+    assert get_cached_content('test_table', build) is first
+    assert len(built) == 1
+
+    bump_version('test_table')
+    second = get_cached_content('test_table', build)
+    assert len(built) == 2
+    assert second.content == b'[2]'
+    assert second.etag != first.etag
+
+
+@pytest.mark.caching
+def test_etag_depends_only_on_content():
+    first = get_cached_content('table_a', lambda: b'[]')
+    second = get_cached_content('table_b', lambda: b'[]')
+    assert first.etag == second.etag
+    assert first.etag.startswith('"') and first.etag.endswith('"')
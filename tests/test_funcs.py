@@ -45,3 +45,64 @@ invalid_colors = ('1', '12', '1234', '1234567', 'a', '12g', '12a12af')
 @pytest.mark.parametrize('color', invalid_colors)
 def test_color_invalid(color):
     pytest.raises(ValidationError, hex_color_validator, color)
+
+
+@pytest.mark.validators
+def test_ingredients_validator_reports_unknown_ids(db):
+    from core.validators import ingredients_validator
+    from recipes.models import Ingredient
+
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    valid = ingredients_validator(
+        [{'id': salt.pk, 'amount': '5'}], Ingredient
+    )
+    assert valid == {salt.pk: (salt, 5)}
+
+    with pytest.raises(ValidationError) as error:
+        ingredients_validator(
+            [
+                {'id': salt.pk, 'amount': 1},
+                {'id': str(salt.pk + 1), 'amount': 1},
+            ],
+            Ingredient,
+        )
+    assert error.value.messages == [
+        f'Не существует ингредиентов с id: {salt.pk + 1}'
+    ]
+
+
+@pytest.mark.validators
+def test_ingredients_validator_queries_only_missing_ids(db):
+    from core.caching import get_cached_objects
+    from core.validators import ingredients_validator
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from recipes.models import Ingredient
+
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+    ingredients_validator([{'id': salt.pk, 'amount': 1}], Ingredient)
+    cached = get_cached_objects('ingredients', Ingredient.objects.in_bulk)
+    # bulk_create не отправляет сигналы, кэш справочника не сбрасывается
+    [sugar] = Ingredient.objects.bulk_create(
+        [Ingredient(name='сахар', measurement_unit='г')]
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        valid = ingredients_validator(
+            [{'id': salt.pk, 'amount': 1}, {'id': sugar.pk, 'amount': 2}],
+            Ingredient,
+        )
+        with pytest.raises(ValidationError):
+            ingredients_validator(
+                [{'id': sugar.pk + 1, 'amount': 1}], Ingredient
+            )
+
+    assert valid == {salt.pk: (salt, 1), sugar.pk: (sugar, 2)}
+    assert len(queries) == 2
+    # Запрашиваются только id, которых нет в кэше
+    assert f'IN ({sugar.pk})' in queries[0]['sql']
+    assert f'IN ({sugar.pk + 1})' in queries[1]['sql']
+    assert get_cached_objects(
+        'ingredients', Ingredient.objects.in_bulk
+    ) is cached
@@ -0,0 +1,220 @@
+import pytest
+
+
+@pytest.mark.images
+def test_process_image_builds_variants(tmp_path, django_db):
+    from core.images import process_image, variant_name
+    from PIL import Image
+
+    path = tmp_path / 'dish.png'
+    Image.new('RGBA', (800, 600), (255, 0, 0, 128)).save(path)
+
+    process_image(str(path))
+
+    with Image.open(path) as image:
+        assert image.size == (500, 375)
+        assert image.format == 'PNG'
+    with Image.open(variant_name(str(path), 'small', 'webp')) as image:
+        assert image.size == (160, 120)
+        assert image.format == 'WEBP'
+    with Image.open(variant_name(str(path), 'medium', 'jpeg')) as image:
+        assert image.size == (320, 240)
+        assert image.mode == 'RGB'
+    assert len(list(tmp_path.iterdir())) == 7
+
+
+@pytest.mark.images
+def test_process_image_files_are_readable(tmp_path, django_db):
+    import stat
+
+    from core.images import process_image
+    from PIL import Image
+
+    path = tmp_path / 'dish.jpg'
+    Image.new('RGB', (800, 600)).save(path)
+    path.chmod(0o644)
+
+    process_image(str(path))
+
+    for file in tmp_path.iterdir():
+        assert stat.S_IMODE(file.stat().st_mode) == 0o644, file.name
+
+
+def encode(image, image_format):
+    from base64 import b64encode
+    from io import BytesIO
+
+    buffer = BytesIO()
+    image.save(buffer, image_format)
+    return 'data:image/png;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+@pytest.mark.images
+def test_decode_base64_image():
+    from core.images import decode_base64_image
+    from django.core.exceptions import ValidationError
+    from PIL import Image
+
+    file = decode_base64_image(encode(Image.new('RGB', (40, 30)), 'JPEG'))
+    assert file.name.endswith('.jpg')
+    with Image.open(file) as image:
+        assert image.size == (40, 30)
+
+    for data in (
+        encode(Image.new('RGB', (7000, 1)), 'PNG'),
+        encode(Image.new('RGB', (10, 10)), 'BMP'),
+        'data:image/png;base64,bm90IGFuIGltYWdl',
+        'A' * 12 * 1024 * 1024,
+    ):
+        with pytest.raises(ValidationError):
+            decode_base64_image(data)
+
+
+@pytest.mark.images
+@pytest.mark.parametrize('separator', ['\n', '\r\n', ' '])
+def test_decode_base64_image_with_line_breaks(separator):
+    import os
+
+    from core.images import decode_base64_image
+    from PIL import Image
+
+    image = Image.frombytes('RGB', (160, 160), os.urandom(160 * 160 * 3))
+    data = encode(image, 'PNG').split(',')[1]
+    lines = [data[pos:pos + 76] for pos in range(0, len(data), 76)]
+    assert len(data) > 64 * 1024
+
+    file = decode_base64_image(separator.join(lines) + separator)
+
+    with Image.open(file) as decoded:
+        assert decoded.size == (160, 160)
+        assert decoded.tobytes() == image.tobytes()
+
+
+@pytest.mark.images
+def test_content_addressed_storage_deduplicates(tmp_path, django_db):
+    from core.storage import ContentAddressedStorage
+    from django.core.files.base import ContentFile
+
+    storage = ContentAddressedStorage(location=tmp_path)
+    first = storage.save('images/a.PNG', ContentFile(b'image'))
+    second = storage.save('images/b.png', ContentFile(b'image'))
+    other = storage.save('images/c.png', ContentFile(b'other'))
+
+    assert first == second
+    assert first.startswith('images/61/6105d6cc') and first.endswith('.png')
+    assert other != first
+    assert len(list(tmp_path.glob('images/*/*'))) == 2
+
+
+@pytest.mark.images
+def test_collect_media_garbage(tmp_path, db):
+    import os
+    from io import StringIO
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.test import override_settings
+    from recipes.models import Recipe
+
+    author = get_user_model().objects.create(
+        username='author', email='author@example.com', recipes_count=1
+    )
+    Recipe.objects.bulk_create([
+        Recipe(
+            author=author,
+            name='рецепт',
+            text='-',
+            cooking_time=5,
+            image='recipe_images/ab/ab.png',
+        )
+    ])
+    kept = ['ab/ab.png', 'ab/ab_small.webp', 'ab/ab_full.jpg']
+    orphans = ['cd/cd.png', 'cd/cd_medium.jpg', 'tmp1.png']
+    fresh = ['cd/new.png', 'ef/ef.png']
+    for name in kept + orphans + fresh + ['ef/ef_small.webp']:
+        path = tmp_path / 'recipe_images' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'image')
+        if name not in fresh:
+            os.utime(path, (0, 0))
+
+    def files():
+        return sorted(
+            path.relative_to(tmp_path / 'recipe_images').as_posix()
+            for path in tmp_path.glob('recipe_images/**/*.*')
+        )
+
+    with override_settings(MEDIA_ROOT=tmp_path):
+        out = StringIO()
+        call_command('collect_media_garbage', '--dry-run', stdout=out)
+        assert 'Найдено файлов без ссылок: 3' in out.getvalue()
+        assert len(files()) == 9
+
+        call_command('collect_media_garbage', stdout=StringIO())
+        assert files() == sorted(kept + fresh + ['ef/ef_small.webp'])
+
+
+@pytest.mark.images
+def test_collect_media_garbage_releases_queued_images(tmp_path, db):
+    import os
+    from io import StringIO
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.test import override_settings
+    from recipes.models import Recipe, ReleasedImage
+
+    author = get_user_model().objects.create(
+        username='author', email='author@example.com', recipes_count=5
+    )
+    images = ['ab/ab.png', 'ab/ab.png', 'cd/cd.png', 'ef/ef.png', 'gh/gh.png']
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            author=author,
+            name=f'рецепт {idx}',
+            text='-',
+            cooking_time=5,
+            image=f'recipe_images/{image}',
+        )
+        for idx, image in enumerate(images)
+    )
+    kept = ['ab/ab.png', 'ab/ab_small.webp', 'zz.png']
+    released = ['cd/cd.png', 'cd/cd_small.webp', 'cd/cd_full.jpg']
+    replaced = ['ef/ef.png', 'ef/ef_medium.jpg']
+    for name in kept + released + replaced + ['gh/gh.png']:
+        path = tmp_path / 'recipe_images' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'image')
+        if name != 'gh/gh.png':
+            os.utime(path, (0, 0))
+
+    def files():
+        return sorted(
+            path.relative_to(tmp_path / 'recipe_images').as_posix()
+            for path in tmp_path.glob('recipe_images/**/*.*')
+        )
+
+    recipes[0].delete()
+    recipes[2].delete()
+    recipes[4].delete()
+    recipe = Recipe.objects.get(pk=recipes[3].pk)
+    recipe.image = 'recipe_images/ij/ij.png'
+    recipe.save()
+    assert ReleasedImage.objects.count() == 4
+
+    with override_settings(MEDIA_ROOT=tmp_path):
+        out = StringIO()
+        call_command(
+            'collect_media_garbage', '--queue-only', '--dry-run', stdout=out
+        )
+        assert 'Найдено файлов без ссылок: 5' in out.getvalue()
+        assert ReleasedImage.objects.count() == 4
+
+        call_command('collect_media_garbage', '--queue-only', stdout=out)
+        assert files() == sorted(kept + ['gh/gh.png'])
+        assert list(ReleasedImage.objects.values_list('name', flat=True)) == [
+            'recipe_images/gh/gh.png'
+        ]
+
+        call_command('collect_media_garbage', stdout=out)
+        assert files() == ['ab/ab.png', 'ab/ab_small.webp', 'gh/gh.png']
@@ -0,0 +1,56 @@
+import pytest
+
+
+def encode(value):
+    import json
+    from base64 import urlsafe_b64encode
+
+    return urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.pagination
+@pytest.mark.parametrize('cursor', [
+    '!!!',
+    encode({'pub_date': 1}),
+    encode(['2023-01-01T00:00:00']),
+    encode([['2023-01-01T00:00:00'], 1]),
+    encode(['2023-01-01T00:00:00', None]),
+    encode(['2023-01-01T00:00:00', True]),
+    encode(['2023-01-01T00:00:00', 'abc']),
+    encode(['not a date', 1]),
+])
+def test_invalid_cursor(db, cursor):
+    from rest_framework.test import APIClient
+
+    response = APIClient().get('/api/recipes/', {'cursor': cursor})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.pagination
+def test_cursor_pages(db):
+    from django.contrib.auth import get_user_model
+    from recipes.models import Recipe
+    from rest_framework.test import APIClient
+
+    author = get_user_model().objects.create(
+        username='author', email='author@example.com', recipes_count=3
+    )
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=author,
+            name=f'рецепт {idx}',
+            text='-',
+            cooking_time=5,
+            image=f'recipe_images/{idx}.png',
+        )
+        for idx in range(3)
+    )
+    client = APIClient()
+
+    first = client.get('/api/recipes/', {'cursor': '', 'limit': 2}).json()
+    second = client.get(first['next']).json()
+
+    assert len(first['results']) == 2
+    assert len(second['results']) == 1
+    assert second['next'] is None
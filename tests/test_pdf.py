@@ -0,0 +1,86 @@
+import re
+import zlib
+from pathlib import Path
+
+import pytest
+
+FONT = Path('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
+pytestmark = pytest.mark.skipif(not FONT.exists(), reason='Нет шрифта')
+
+
+def make_pdf(lines):
+    from core.pdf import TextPDF
+
+    return b''.join(TextPDF(FONT).stream(lines))
+
+
+def streams(pdf):
+    for match in re.finditer(rb'/Length (\d+)[^>]*>>\s*stream\r?\n', pdf):
+        data = pdf[match.end():match.end() + int(match.group(1))]
+        try:
+            yield zlib.decompress(data)
+        except zlib.error:
+            yield data
+
+
+@pytest.mark.pdf
+@pytest.mark.parametrize('count, pages', ((0, 1), (1, 1), (50, 2), (120, 3)))
+def test_pages(count, pages):
+    pdf = make_pdf(f'строка {idx}' for idx in range(count))
+    assert pdf.startswith(b'%PDF-')
+    assert pdf.rstrip().endswith(b'%%EOF')
+    assert re.search(rf'/Count {pages}\b'.encode(), pdf)
+
+
+@pytest.mark.pdf
+def test_font_is_subset():
+    pdf = make_pdf(['мука: 5 г'] * 60)
+    assert len(pdf) < FONT.stat().st_size // 10
+
+
+@pytest.mark.pdf
+def test_non_cyrillic_text():
+    pdf = make_pdf(['crème brûlée: ½ стакана'])
+    cmaps = b''.join(data for data in streams(pdf) if b'bfchar' in data)
+    for char in 'èûé½с':
+        assert f'<{ord(char):04X}>'.encode() in cmaps, char
+
+
+@pytest.mark.pdf
+def test_long_lines_are_wrapped():
+    from core.pdf import TextPDF
+
+    pdf = TextPDF(FONT)
+    line = 'очень длинное название ингредиента ' * 10
+    parts = list(pdf.wrap(line))
+    assert len(parts) > 1
+    assert ' '.join(parts) == line.strip()
+
+    word = 'ж' * 300
+    parts = list(pdf.wrap(word))
+    assert ''.join(parts) == word
+    for part in parts:
+        assert pdf._width(part) <= pdf.text_width
+    assert list(pdf.wrap('')) == ['']
+
+
+@pytest.mark.pdf
+def test_pages_are_streamed():
+    from core.pdf import TextPDF
+
+    read = []
+
+    def lines():
+        for idx in range(1000):
+            read.append(idx)
+            yield f'строка {idx}'
+
+    chunks = TextPDF(FONT).stream(lines())
+    assert next(chunks).startswith(b'%PDF-')
+    assert b'/Type /Page ' in next(chunks)
+    assert len(read) < 100
+
+    pdf = b''.join(chunks)
+    assert len(read) == 1000
+    assert re.search(rb'/Count 24\b', pdf)
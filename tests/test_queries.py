@@ -0,0 +1,239 @@
+import pytest
+
+
+def recipes_queryset(query: str = "", user=None):
+    from api.views import RecipeViewSet
+    from django.contrib.auth.models import AnonymousUser
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    request = Request(APIRequestFactory().get(f"/api/recipes/?{query}"))
+    request.user = user or AnonymousUser()
+    view = RecipeViewSet(request=request, format_kwarg=None)
+    return view.get_queryset()
+
+
+@pytest.mark.queries
+def test_tags_filter_is_semi_join(db):
+    from recipes.models import Recipe
+
+    before = Recipe.objects.filter(tags__slug__in=["breakfast"]).distinct()
+    after = recipes_queryset("tags=breakfast&tags=lunch")
+    before_plan, after_plan = before.explain(), after.explain()
+    print("BEFORE:", before_plan, "AFTER:", after_plan, sep="\n")
+
+    assert "DISTINCT" in before_plan
+    assert "DISTINCT" not in after_plan
+    assert 'JOIN "recipes_recipe_tags"' not in str(after.query)
+    assert "EXISTS" in str(after.query)
+
+
+@pytest.mark.queries
+def test_recipe_feed_uses_pub_date_index(db):
+    plan = recipes_queryset().explain()
+    print(plan)
+
+    assert "recipe_pub_date_id_idx" in plan
+
+
+@pytest.mark.queries
+@pytest.mark.parametrize("model_name", ("Favorites", "Carts"))
+def test_user_lists_use_user_recipe_index(db, model_name):
+    from django.apps import apps
+    from django.contrib.auth import get_user_model
+
+    model = apps.get_model("recipes", model_name)
+    user = get_user_model().objects.create(
+        username="Tester", email="tester@foodgram.ru"
+    )
+    plan = model.objects.filter(user=user).values("recipe").explain()
+    print(plan)
+
+    assert f"{model_name.lower()}_user_recipe_idx" in plan
+
+
+@pytest.mark.queries
+def test_insert_ignore_skips_duplicate(db):
+    from core.services import insert_ignore
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from users.models import Subscriptions
+
+    User = get_user_model()
+    author = User.objects.create(username='author', email='a@example.com')
+    user = User.objects.create(username='reader', email='r@example.com')
+
+    with CaptureQueriesContext(connection) as context:
+        assert insert_ignore(Subscriptions(None, author.pk, user.pk))
+        assert not insert_ignore(Subscriptions(None, author.pk, user.pk))
+
+    assert len(context.captured_queries) == 2
+    assert 'IGNORE' in context.captured_queries[0]['sql']
+    assert Subscriptions.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.queries
+def test_insert_link_checks_target(db):
+    from core.services import insert_link
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from users.models import Subscriptions
+
+    User = get_user_model()
+    author = User.objects.create(username='author', email='a@example.com')
+    user = User.objects.create(username='reader', email='r@example.com')
+
+    with CaptureQueriesContext(connection) as context:
+        assert insert_link(Subscriptions(None, author.pk, user.pk), 'author')
+        assert not insert_link(
+            Subscriptions(None, author.pk, user.pk), 'author'
+        )
+        assert not insert_link(Subscriptions(None, 0, user.pk), 'author')
+
+    assert len(context.captured_queries) == 3
+    assert Subscriptions.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.queries
+def test_bulk_insert_ignore_returns_inserted_rows(db):
+    from core.services import bulk_insert_ignore
+    from django.contrib.auth import get_user_model
+    from users.models import Subscriptions
+
+    User = get_user_model()
+    user = User.objects.create(username='reader', email='r@example.com')
+    first, second = (
+        User.objects.create(username=name, email=f'{name}@example.com')
+        for name in ('first', 'second')
+    )
+    Subscriptions.objects.create(author=first, user=user)
+
+    inserted = bulk_insert_ignore(
+        (
+            Subscriptions(author_id=author.pk, user_id=user.pk)
+            for author in (first, second)
+        ),
+        'author_id',
+    )
+
+    assert inserted == [second.pk]
+    assert Subscriptions.objects.filter(user=user).count() == 2
+
+
+@pytest.mark.queries
+def test_author_recipes_limit_per_author(db):
+    from core.services import author_recipes
+    from django.contrib.auth import get_user_model
+    from django.db.models import prefetch_related_objects
+    from recipes.models import Recipe
+
+    User = get_user_model()
+    authors = [
+        User.objects.create(username=name, email=f'{name}@example.com')
+        for name in ('first', 'second')
+    ]
+    Recipe.objects.bulk_create(
+        Recipe(author=author, name=f'{author} {idx}', text='-', cooking_time=1)
+        for author in authors
+        for idx in range(3)
+    )
+
+    prefetch_related_objects(
+        authors, author_recipes([author.pk for author in authors], 2)
+    )
+
+    for author in authors:
+        recipes = author.recipes.all()
+        assert [recipe.name for recipe in recipes] == [
+            f'{author} 2',
+            f'{author} 1',
+        ]
+
+
+@pytest.mark.queries
+def test_timeline_fan_out_and_index(db):
+    from core.services import backfill_timeline, clear_timeline, fan_out_recipe
+    from django.contrib.auth import get_user_model
+    from recipes.models import Recipe, Timeline
+    from users.models import Subscriptions
+
+    User = get_user_model()
+    author, reader, late = (
+        User.objects.create(username=name, email=f'{name}@example.com')
+        for name in ('author', 'reader', 'late')
+    )
+    Subscriptions.objects.create(author=author, user=reader)
+    recipe = Recipe.objects.bulk_create(
+        [Recipe(author=author, name='new', text='-', cooking_time=1)]
+    )[0]
+
+    fan_out_recipe(recipe)
+    backfill_timeline(late.pk, author.pk)
+    assert set(Timeline.objects.values_list('user', flat=True)) == {
+        reader.pk,
+        late.pk,
+    }
+
+    clear_timeline(late.pk, author.pk)
+    assert not late.timeline.exists()
+
+    plan = reader.timeline.order_by('-pub_date', '-recipe_id').explain()
+    print(plan)
+    assert 'timeline_user_pub_date_idx' in plan
+
+
+@pytest.mark.queries
+def test_favorite_endpoint_checks_recipe_in_insert(db):
+    from django.contrib.auth import get_user_model
+    from recipes.models import Favorites, Recipe
+    from rest_framework.test import APIClient
+
+    user = get_user_model().objects.create(
+        username='reader', email='r@example.com'
+    )
+    recipe = Recipe.objects.create(
+        author=user,
+        name='рецепт',
+        text='-',
+        cooking_time=5,
+        image='recipes/images/1.png',
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    url = f'/api/recipes/{recipe.pk}/favorite/'
+
+    assert client.post(url).status_code == 201
+    assert client.post(url).status_code == 400
+    assert client.post('/api/recipes/0/favorite/').status_code == 404
+    assert client.post('/api/recipes/abc/favorite/').status_code == 404
+    assert Favorites.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.queries
+def test_bulk_delete_links_returns_deleted_ids(db):
+    from core.services import bulk_delete_links
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from users.models import Subscriptions
+
+    User = get_user_model()
+    user = User.objects.create(username='reader', email='r@example.com')
+    first, second = (
+        User.objects.create(username=name, email=f'{name}@example.com')
+        for name in ('first', 'second')
+    )
+    Subscriptions.objects.create(author=first, user=user)
+    Subscriptions.objects.create(author=second, user=first)
+
+    with CaptureQueriesContext(connection) as context:
+        deleted = bulk_delete_links(
+            Subscriptions, 'author', user.pk, [first.pk, second.pk]
+        )
+
+    assert deleted == [first.pk]
+    assert len(context.captured_queries) == 1
+    assert not Subscriptions.objects.filter(user=user).exists()
+    assert Subscriptions.objects.filter(user=first).exists()
@@ -0,0 +1,39 @@
+import pytest
+
+
+@pytest.mark.reference_data
+def test_load_reference_data_twice(tmp_path, db):
+    import json
+    from io import StringIO
+
+    from django.core.management import call_command
+    from recipes.models import Ingredient, Tag
+
+    dump = tmp_path / 'dump.json'
+    dump.write_text(json.dumps([
+        {
+            'model': 'recipes.tag',
+            'pk': 1,
+            'fields': {'name': 'завтрак', 'color': '#FFFC66', 'slug': 'b'},
+        },
+        {
+            'model': 'recipes.tag',
+            'pk': 2,
+            'fields': {'name': 'обед', 'color': '#54E709', 'slug': 'l'},
+        },
+        {
+            'model': 'recipes.ingredient',
+            'pk': 1,
+            'fields': {'name': 'соль', 'measurement_unit': 'г'},
+        },
+    ]))
+    Tag.objects.create(pk=5, name='ужин', color='#E4007C', slug='l')
+
+    for added in (2, 0):
+        out = StringIO()
+        call_command('load_reference_data', str(dump), stdout=out)
+        assert f'добавлено: {added}' in out.getvalue()
+        assert Tag.objects.count() == 2
+        assert Ingredient.objects.count() == 1
+
+    assert Tag.objects.get(slug='l').name == 'ужин'
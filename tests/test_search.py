@@ -0,0 +1,116 @@
+import json
+from time import perf_counter
+
+import pytest
+from core.search import PrefixIndex, TrigramIndex, trigrams
+
+names = ('мука', 'мёд', 'сахар', 'сахарная пудра', 'ванильный сахар', 'Мускат')
+
+
+def make_index(loaded=None):
+    def loader():
+        if loaded is not None:
+            loaded.append(1)
+        return ((name, name) for name in names)
+
+    return PrefixIndex(loader)
+
+
+@pytest.mark.search
+def test_prefix_matches_go_first():
+    index = make_index()
+    assert index.search('сахар') == [
+        'сахар', 'сахарная пудра', 'ванильный сахар'
+    ]
+
+
+@pytest.mark.search
+@pytest.mark.parametrize(
+    'query, expected',
+    (
+        ('му', ['мука', 'Мускат']),
+        ('МУ', ['мука', 'Мускат']),
+        ('пудр', ['сахарная пудра']),
+        ('ёд', ['мёд']),
+        ('соль', []),
+    ),
+)
+def test_search(query, expected):
+    assert make_index().search(query) == expected
+
+
+@pytest.mark.search
+def test_index_is_built_once_until_invalidated():
+    loaded = []
+    index = make_index(loaded)
+    index.search('м')
+    index.search('с')
+    assert len(loaded) == 1
+
+    index.invalidate()
+    index.search('м')
+    assert len(loaded) == 2
+
+
+@pytest.mark.search
+def test_search_during_rebuild_uses_previous_snapshot():
+    from threading import Event, Thread
+
+    loading, release = Event(), Event()
+    datasets = iter((names, ('сахарин',)))
+
+    def loader():
+        data = next(datasets)
+        if data != names:
+            loading.set()
+            release.wait(5)
+        return ((name, name) for name in data)
+
+    index = TrigramIndex(loader)
+    assert index.search('сахар', limit=1) == ['сахар']
+
+    rebuild = Thread(target=index.build)
+    rebuild.start()
+    loading.wait(5)
+    assert index.search('сахар', limit=1) == ['сахар']
+    release.set()
+    rebuild.join()
+
+    assert index.search('сахар', limit=1) == ['сахарин']
+
+
+@pytest.mark.search
+def test_trigrams_like_pg_trgm():
+    assert trigrams('Кот') == {'  к', ' ко', 'кот', 'от '}
+    assert trigrams('') == set()
+
+
+def dump_ingredients():
+    from conftest import BACKEND_DIR
+
+    with open(BACKEND_DIR / 'data' / 'dump.json', encoding='utf-8') as file:
+        return [
+            (obj['fields']['name'], obj['fields']['name'])
+            for obj in json.load(file)
+            if obj['model'] == 'recipes.ingredient'
+        ]
+
+
+@pytest.mark.search
+@pytest.mark.parametrize(
+    'query, expected',
+    (
+        ('малоко', 'молоко'),
+        ('шоколат', 'шоколад'),
+        ('сыр маскарпон', 'сыр Маскарпоне'),
+        ('картофил', 'картофель'),
+    ),
+)
+def test_trigram_index_finds_typos(query, expected):
+    index = TrigramIndex(dump_ingredients)
+    start = perf_counter()
+    found = index.search(query, limit=5)
+    print(f'{query}: {(perf_counter() - start) * 1000:.3f} ms')
+
+    assert found[0] == expected
+    assert len(found) <= 5
@@ -0,0 +1,137 @@
+import pytest
+
+
+@pytest.fixture
+def cart(db):
+    from django.contrib.auth import get_user_model
+    from recipes.models import AmountIngredient, Carts, Ingredient, Recipe
+
+    user = get_user_model().objects.create(
+        username='buyer', email='buyer@example.com', recipes_count=2
+    )
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+    egg = Ingredient.objects.create(name='яйцо', measurement_unit='шт')
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            author=user,
+            name=f'рецепт {amount}',
+            text='-',
+            cooking_time=5,
+            image=f'recipes/images/{amount}.png',
+        )
+        for amount in (2, 3)
+    )
+    for recipe, amount in zip(recipes, (2, 3)):
+        AmountIngredient.objects.create(
+            recipe=recipe, ingredients=salt, amount=amount
+        )
+        AmountIngredient.objects.create(
+            recipe=recipe, ingredients=egg, amount=1
+        )
+        Carts.objects.create(user=user, recipe=recipe)
+    return user, recipes
+
+
+def shopping_list(user):
+    return dict(user.shopping_list.values_list('ingredient__name', 'amount'))
+
+
+@pytest.mark.shopping_list
+def test_shopping_list_follows_cart(cart):
+    from core.services import change_shopping_lists
+
+    user, (first, second) = cart
+    change_shopping_lists([first.pk], [user.pk], 1)
+    change_shopping_lists([second.pk], [user.pk], 1)
+    assert shopping_list(user) == {'соль': 5, 'яйцо': 2}
+
+    change_shopping_lists([first.pk], [user.pk], -1)
+    assert shopping_list(user) == {'соль': 3, 'яйцо': 1}
+
+    second.delete()
+    assert shopping_list(user) == {}
+
+
+@pytest.mark.shopping_list
+def test_shopping_list_sums_several_recipes(cart):
+    from core.services import change_shopping_lists
+
+    user, recipes = cart
+    change_shopping_lists([recipe.pk for recipe in recipes], [user.pk], 1)
+    assert shopping_list(user) == {'соль': 5, 'яйцо': 2}
+
+    change_shopping_lists([recipe.pk for recipe in recipes], [user.pk], -1)
+    assert shopping_list(user) == {}
+
+
+@pytest.mark.shopping_list
+def test_rebuild_shopping_lists(cart):
+    from core.services import rebuild_shopping_lists, shopping_list_ingredients
+
+    user, _ = cart
+    assert rebuild_shopping_lists() == 2
+    assert list(shopping_list_ingredients(user)) == [
+        {'name': 'соль', 'measurement': 'г', 'amount': 5},
+        {'name': 'яйцо', 'measurement': 'шт', 'amount': 2},
+    ]
+
+
+@pytest.mark.shopping_list
+def test_shopping_list_merges_units(cart):
+    from core.services import rebuild_shopping_lists, shopping_list_ingredients
+    from recipes.models import AmountIngredient, Ingredient
+
+    user, (first, _) = cart
+    salt_kg = Ingredient.objects.create(name='соль', measurement_unit='кг')
+    AmountIngredient.objects.create(
+        recipe=first, ingredients=salt_kg, amount=1
+    )
+    rebuild_shopping_lists()
+
+    assert list(shopping_list_ingredients(user))[0] == {
+        'name': 'соль', 'measurement': 'г', 'amount': 1005
+    }
+
+
+@pytest.mark.shopping_list
+def test_ingredients_update_keeps_unchanged_rows(cart):
+    from core.services import rebuild_shopping_lists, recipe_ingredients_update
+    from recipes.models import Ingredient
+
+    user, (first, _) = cart
+    rebuild_shopping_lists()
+    salt, egg = first.ingredient.order_by('ingredients__name')
+    pepper = Ingredient.objects.create(name='перец', measurement_unit='г')
+
+    recipe_ingredients_update(
+        first,
+        {salt.ingredients_id: (salt.ingredients, 4), pepper.pk: (pepper, 1)},
+    )
+
+    rows = dict(first.ingredient.values_list('ingredients__name', 'id'))
+    assert rows == {'соль': salt.pk, 'перец': rows['перец']}
+    assert shopping_list(user) == {'соль': 7, 'яйцо': 1, 'перец': 1}
+
+
+@pytest.mark.shopping_list
+def test_shopping_list_endpoint_merges_units(cart):
+    from core.services import rebuild_shopping_lists
+    from recipes.models import AmountIngredient, Ingredient
+    from rest_framework.test import APIClient
+
+    user, (first, _) = cart
+    salt_kg = Ingredient.objects.create(name='соль', measurement_unit='кг')
+    AmountIngredient.objects.create(
+        recipe=first, ingredients=salt_kg, amount=1
+    )
+    rebuild_shopping_lists()
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get('/api/recipes/shopping_list/')
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {'name': 'соль', 'measurement_unit': 'г', 'amount': 1005},
+        {'name': 'яйцо', 'measurement_unit': 'шт', 'amount': 2},
+    ]
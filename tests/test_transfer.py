@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def media(tmp_path, django_db):
+    from django.test import override_settings
+
+    image = tmp_path / 'recipe_images' / 'ab' / 'ab.jpg'
+    image.parent.mkdir(parents=True)
+    image.write_bytes(b'image')
+    with override_settings(MEDIA_ROOT=tmp_path):
+        yield tmp_path
+
+
+@pytest.mark.transfer
+def test_export_import_round_trip(db, media):
+    from core.transfer import export_recipes, import_recipes
+    from django.contrib.auth import get_user_model
+    from recipes.models import AmountIngredient, Ingredient, Recipe, Tag
+
+    author = get_user_model().objects.create(
+        username='chef', email='chef@example.com', recipes_count=1
+    )
+    tag = Tag.objects.create(name='завтрак', color='#FFFFFF', slug='breakfast')
+    egg = Ingredient.objects.create(name='яйцо', measurement_unit='шт')
+    (recipe,) = Recipe.objects.bulk_create([
+        Recipe(
+            author=author,
+            name='омлет',
+            text='-',
+            cooking_time=10,
+            image='recipe_images/ab/ab.jpg',
+        )
+    ])
+    recipe.tags.add(tag)
+    AmountIngredient.objects.create(recipe=recipe, ingredients=egg, amount=2)
+
+    lines = list(export_recipes())
+    record = json.loads(lines[0])
+    assert record['author'] == 'chef'
+    assert record['tags'] == ['breakfast']
+    assert record['ingredients'] == [
+        {'name': 'яйцо', 'measurement_unit': 'шт', 'amount': 2}
+    ]
+
+    result = import_recipes(lines)
+    assert (result.created, result.skipped) == (0, 1)
+
+    recipe.delete()
+    result = import_recipes([*lines, b'{"name": 1}'])
+    assert (result.created, result.skipped) == (1, 1)
+    assert result.errors == ['Строка 2: неправильная запись.']
+    assert list(export_recipes()) == lines
+    author.refresh_from_db()
+    assert author.recipes_count == 1
+
+
+@pytest.mark.transfer
+def test_import_reports_invalid_records(db, media):
+    from core.transfer import import_recipes
+    from django.contrib.auth import get_user_model
+    from recipes.models import Ingredient, Recipe
+
+    get_user_model().objects.create(username='chef', email='chef@example.com')
+    Ingredient.objects.create(name='яйцо', measurement_unit='шт')
+
+    def line(**changes):
+        record = {
+            'name': 'омлет',
+            'author': 'chef',
+            'pub_date': '2023-01-01T10:00:00+00:00',
+            'image': 'recipe_images/ab/ab.jpg',
+            'text': '-',
+            'cooking_time': 10,
+            'tags': [],
+            'ingredients': [
+                {'name': 'яйцо', 'measurement_unit': 'шт', 'amount': 2}
+            ],
+        }
+        record.update(changes)
+        return json.dumps(record)
+
+    egg = {'name': 'яйцо', 'measurement_unit': 'шт'}
+    result = import_recipes([
+        line(cooking_time=-5),
+        line(ingredients=[{**egg, 'amount': 0}]),
+        line(name='о' * 1000),
+        line(image='recipe_images/ab/missing.jpg'),
+        line(image='recipe_images/../../etc/passwd'),
+        line(),
+    ])
+
+    assert (result.created, result.skipped) == (1, 5)
+    assert [error.split(':')[0] for error in result.errors] == [
+        f'Строка {number}' for number in range(1, 6)
+    ]
+    assert 'cooking_time' in result.errors[0]
+    assert 'amount' in result.errors[1]
+    assert 'name' in result.errors[2]
+    assert Recipe.objects.get().cooking_time == 10